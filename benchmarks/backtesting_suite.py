@@ -0,0 +1,222 @@
+"""
+Benchmarks the backtesting of every bundled controller over synthetic candles and compares the throughput and memory
+with a baseline file, to spot regressions after upgrades.
+
+    python -m benchmarks.backtesting_suite --days 7 --repeats 3
+    python -m benchmarks.backtesting_suite --update-baseline
+
+Each controller runs in its own process, so the peak RSS is the one of its backtests. The baseline file is written the
+first time (or with --update-baseline) and is specific to the machine that wrote it. Exits with 1 when a controller is
+slower or uses more memory than the baseline by more than the tolerance.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+from benchmarks.synthetic_data import populate_candles_store
+from benchmarks.vectorized_backtesting import CONNECTOR_NAME, CONTROLLER_CONFIGS, START_TIME, TRADING_PAIR, no_trading_rules
+from services.backtesting_data_provider import create_backtesting_engine
+from services.backtesting_service import run_backtesting
+from services.candles_store import HistoricalCandlesStore
+
+CONTROLLERS_PATH = Path("bots/controllers")
+DEFAULT_BASELINE_PATH = "benchmarks/backtesting_baseline.json"
+
+BENCHMARK_CONFIGS = {
+    **CONTROLLER_CONFIGS,
+    "dman_v3": {
+        "controller_type": "directional_trading",
+        "controller_name": "dman_v3",
+        "connector_name": CONNECTOR_NAME,
+        "trading_pair": TRADING_PAIR,
+        "total_amount_quote": 1000,
+        "max_executors_per_side": 2,
+        "cooldown_time": 300,
+        "stop_loss": 0.03,
+        "take_profit": 0.01,
+        "time_limit": 3600 * 6,
+        "interval": "3m",
+    },
+    "pmm_simple": {
+        "controller_type": "market_making",
+        "controller_name": "pmm_simple",
+        "connector_name": CONNECTOR_NAME,
+        "trading_pair": TRADING_PAIR,
+        "total_amount_quote": 1000,
+        "buy_spreads": [0.002, 0.004],
+        "sell_spreads": [0.002, 0.004],
+        "executor_refresh_time": 300,
+        "cooldown_time": 60,
+        "stop_loss": 0.01,
+        "take_profit": 0.005,
+        "time_limit": 3600,
+    },
+    "pmm_dynamic": {
+        "controller_type": "market_making",
+        "controller_name": "pmm_dynamic",
+        "connector_name": CONNECTOR_NAME,
+        "trading_pair": TRADING_PAIR,
+        "total_amount_quote": 1000,
+        "buy_spreads": [1, 2],
+        "sell_spreads": [1, 2],
+        "executor_refresh_time": 300,
+        "cooldown_time": 60,
+        "stop_loss": 0.01,
+        "take_profit": 0.005,
+        "time_limit": 3600,
+        "interval": "3m",
+    },
+    "dman_maker_v2": {
+        "controller_type": "market_making",
+        "controller_name": "dman_maker_v2",
+        "connector_name": CONNECTOR_NAME,
+        "trading_pair": TRADING_PAIR,
+        "total_amount_quote": 1000,
+        "buy_spreads": [0.002],
+        "sell_spreads": [0.002],
+        "executor_refresh_time": 300,
+        "cooldown_time": 60,
+        "stop_loss": 0.03,
+        "take_profit": 0.01,
+        "time_limit": 3600 * 6,
+    },
+}
+
+# Controllers the backtesting engine can't simulate: it only supports position and DCA executors.
+UNSUPPORTED_CONTROLLERS = {
+    "ai_livestream": "needs the predictions published over MQTT",
+    "arbitrage_controller": "uses arbitrage executors",
+    "basic_order_example": "uses order executors",
+    "basic_order_open_close_example": "uses order executors",
+    "grid_strike": "uses grid executors",
+    "pmm": "uses order executors",
+    "quantum_grid_allocator": "uses grid executors",
+    "xemm_multiple_levels": "uses XEMM executors",
+}
+
+
+def get_bundled_controllers():
+    return sorted(path.stem for path in CONTROLLERS_PATH.glob("*/*.py") if path.stem != "__init__")
+
+
+def get_peak_rss_mb() -> float:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return max_rss / 1024 ** 2 if sys.platform == "darwin" else max_rss / 1024
+
+
+def benchmark_controller(candles_store_path: str, controller_name: str, days: int, repeats: int) -> Dict:
+    """
+    Backtests the controller `repeats` times in the current process and returns the fastest run.
+    """
+    candles_store = HistoricalCandlesStore(base_path=candles_store_path)
+    backtesting_engine = create_backtesting_engine(candles_store)
+    backtesting_engine.backtesting_data_provider.initialize_trading_rules = no_trading_rules
+    backtesting_config = {"start_time": START_TIME, "end_time": START_TIME + days * 24 * 60 * 60,
+                          "backtesting_resolution": "1m", "trade_cost": 0.0006,
+                          "config": BENCHMARK_CONFIGS[controller_name], "include_processed_data": False}
+    loop = asyncio.new_event_loop()
+    wall_times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        backtesting_results = loop.run_until_complete(run_backtesting(backtesting_engine, backtesting_config))
+        wall_times.append(time.perf_counter() - start)
+    loop.close()
+    candles = len(backtesting_engine.controller.processed_data["features"])
+    wall_time = min(wall_times)
+    return {
+        "candles": candles,
+        "wall_time": wall_time,
+        "candles_per_second": candles / wall_time,
+        "peak_rss_mb": get_peak_rss_mb(),
+        "total_executors": backtesting_results["results"]["total_executors"],
+    }
+
+
+def compare_with_baseline(results: Dict, baseline: Dict, tolerance: float) -> Dict[str, list]:
+    regressions = {}
+    for controller_name, controller_results in results.items():
+        baseline_results = baseline.get(controller_name)
+        if baseline_results is None or "error" in controller_results:
+            continue
+        controller_regressions = []
+        throughput_change = controller_results["candles_per_second"] / baseline_results["candles_per_second"] - 1
+        if throughput_change < -tolerance:
+            controller_regressions.append(f"candles/s {throughput_change:+.1%}")
+        rss_change = controller_results["peak_rss_mb"] / baseline_results["peak_rss_mb"] - 1
+        if rss_change > tolerance:
+            controller_regressions.append(f"peak RSS {rss_change:+.1%}")
+        if controller_regressions:
+            regressions[controller_name] = controller_regressions
+    return regressions
+
+
+def load_baseline(baseline_path: str, parameters: Dict) -> Optional[Dict]:
+    if not os.path.exists(baseline_path):
+        return None
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    if baseline["parameters"] != parameters:
+        print(f"The baseline was recorded with {baseline['parameters']}, the comparison is not meaningful.")
+    return baseline["results"]
+
+
+def main(days: int, repeats: int, baseline_path: str, update_baseline: bool, tolerance: float) -> int:
+    parameters = {"days": days, "repeats": repeats}
+    results = {}
+    with tempfile.TemporaryDirectory() as candles_store_path:
+        # One extra day before the start covers the candles buffer of the indicators.
+        populate_candles_store(HistoricalCandlesStore(base_path=candles_store_path), CONNECTOR_NAME, TRADING_PAIR,
+                               START_TIME - 24 * 60 * 60, START_TIME + days * 24 * 60 * 60)
+        for controller_name in get_bundled_controllers():
+            if controller_name not in BENCHMARK_CONFIGS:
+                reason = UNSUPPORTED_CONTROLLERS.get(controller_name, "no benchmark config")
+                print(f"{controller_name}: skipped, {reason}")
+                continue
+            # A new process for every controller, so its peak RSS doesn't include the previous controllers.
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                try:
+                    results[controller_name] = executor.submit(benchmark_controller, candles_store_path,
+                                                               controller_name, days, repeats).result()
+                except Exception as e:
+                    results[controller_name] = {"error": str(e)}
+                    print(f"{controller_name}: failed, {e}")
+                    continue
+            controller_results = results[controller_name]
+            print(f"{controller_name}: {controller_results['candles']} candles in {controller_results['wall_time']:.3f}s, "
+                  f"{controller_results['candles_per_second']:.0f} candles/s, "
+                  f"peak RSS {controller_results['peak_rss_mb']:.0f} MB, "
+                  f"{controller_results['total_executors']} executors")
+
+    baseline = load_baseline(baseline_path, parameters)
+    if baseline is None or update_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump({"parameters": parameters, "results": results}, f, indent=2)
+        print(f"Baseline written to {baseline_path}")
+        return 0
+    regressions = compare_with_baseline(results, baseline, tolerance)
+    for controller_name, controller_regressions in regressions.items():
+        print(f"REGRESSION {controller_name}: {', '.join(controller_regressions)}")
+    if not regressions:
+        print(f"No regressions over {tolerance:.0%} against {baseline_path}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative change allowed before a regression")
+    args = parser.parse_args()
+    sys.exit(main(args.days, args.repeats, args.baseline, args.update_baseline, args.tolerance))
@@ -0,0 +1,165 @@
+"""
+Compares the per-row parsing, enum decoding and ExecutorInfo materialization of the executors that
+PerformanceDataSource used to do with the current columnar ones, in time and memory.
+
+    python -m benchmarks.performance_data_source --executors 100000 --repeats 3
+
+The executors are generated like the rows of the Executors table, with the config and custom info as JSON strings
+and the timestamps in milliseconds.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from hummingbot.core.data_type.common import TradeType
+from hummingbot.strategy_v2.backtesting.backtesting_engine_base import BacktestingEngineBase
+from hummingbot.strategy_v2.models.base import RunnableStatus
+from hummingbot.strategy_v2.models.executors import CloseType
+from hummingbot.strategy_v2.models.executors_info import ExecutorInfo
+
+from utils.etl_databases import EXECUTOR_INFO_FIELDS, PerformanceDataSource
+
+ENUM_COLUMNS = ["status", "side", "close_type", "close_type_name"]
+
+
+def generate_executors(n_executors: int, seed: int = 42) -> dict:
+    rng = np.random.default_rng(seed)
+    timestamps = 1704067200000 + np.sort(rng.integers(0, 30 * 24 * 60 * 60 * 1000, n_executors))
+    prices = 100 * np.exp(rng.normal(0, 0.05, n_executors))
+    configs, custom_infos = [], []
+    for i in range(n_executors):
+        configs.append(json.dumps({
+            "id": f"executor_{i}", "type": "position_executor", "timestamp": int(timestamps[i]) / 1000,
+            "trading_pair": "BTC-USDT", "connector_name": "binance_perpetual", "side": int(rng.integers(1, 3)),
+            "entry_price": str(prices[i]), "amount": "0.1", "stop_loss": "0.01", "take_profit": "0.02",
+            "time_limit": 3600, "level_id": None if i % 3 else f"buy_{i % 5}", "leverage": 10,
+        }))
+        custom_infos.append(json.dumps({
+            "current_position_average_price": str(prices[i]), "close_price": str(prices[i] * 1.001),
+            "order_ids": [f"order_{i}_open", f"order_{i}_close"], "side": 1,
+        }))
+    net_pnl_quote = rng.normal(0, 1, n_executors)
+    return {
+        "id": [f"executor_{i}" for i in range(n_executors)],
+        "timestamp": timestamps,
+        "type": ["position_executor"] * n_executors,
+        "close_type": rng.integers(1, 5, n_executors),
+        "close_timestamp": timestamps + rng.integers(60, 3600, n_executors) * 1000,
+        "status": [4] * n_executors,
+        "config": configs,
+        "net_pnl_pct": net_pnl_quote / 100,
+        "net_pnl_quote": net_pnl_quote,
+        "cum_fees_quote": np.full(n_executors, 0.06),
+        "filled_amount_quote": np.full(n_executors, 200.0),
+        "is_active": [0] * n_executors,
+        "is_trading": [0] * n_executors,
+        "custom_info": custom_infos,
+        "controller_id": ["main"] * n_executors,
+    }
+
+
+def legacy_executors_df(data_source: PerformanceDataSource) -> pd.DataFrame:
+    executors = pd.DataFrame(data_source.executors_dict)
+    executors["custom_info"] = executors["custom_info"].apply(lambda x: json.loads(x) if isinstance(x, str) else x)
+    executors["config"] = executors["config"].apply(lambda x: json.loads(x) if isinstance(x, str) else x)
+    executors["timestamp"] = executors["timestamp"].apply(lambda x: data_source.ensure_timestamp_in_seconds(x))
+    executors["close_timestamp"] = executors["close_timestamp"].apply(
+        lambda x: data_source.ensure_timestamp_in_seconds(x))
+    executors["trading_pair"] = executors["config"].apply(lambda x: x["trading_pair"])
+    executors["exchange"] = executors["config"].apply(lambda x: x["connector_name"])
+    executors["level_id"] = executors["config"].apply(lambda x: x.get("level_id"))
+    executors["bep"] = executors["custom_info"].apply(lambda x: x["current_position_average_price"])
+    executors["order_ids"] = executors["custom_info"].apply(lambda x: x.get("order_ids"))
+    executors["close_price"] = executors["custom_info"].apply(
+        lambda x: x.get("close_price", x["current_position_average_price"]))
+    executors["sl"] = executors["config"].apply(lambda x: x.get("stop_loss")).fillna(0)
+    executors["tp"] = executors["config"].apply(lambda x: x.get("take_profit")).fillna(0)
+    executors["tl"] = executors["config"].apply(lambda x: x.get("time_limit")).fillna(0)
+    return executors
+
+
+def legacy_apply_special_data_types(data_source: PerformanceDataSource, executors: pd.DataFrame) -> pd.DataFrame:
+    executors["status"] = executors["status"].apply(lambda x: data_source.get_enum_by_value(RunnableStatus, int(x)))
+    executors["side"] = executors["config"].apply(lambda x: data_source.get_enum_by_value(TradeType, int(x["side"])))
+    executors["close_type"] = executors["close_type"].apply(lambda x: data_source.get_enum_by_value(CloseType, int(x)))
+    executors["close_type_name"] = executors["close_type"].apply(lambda x: x.name)
+    executors["datetime"] = pd.to_datetime(executors.timestamp, unit="s")
+    executors["close_datetime"] = pd.to_datetime(executors["close_timestamp"], unit="s")
+    return executors
+
+
+def legacy_executor_info_list(data_source: PerformanceDataSource) -> list:
+    executors = data_source.apply_special_data_types(data_source.executors_df)
+    executor_values = []
+    for index, row in executors.iterrows():
+        executor_to_append = ExecutorInfo(**{field: row[field] for field in EXECUTOR_INFO_FIELDS})
+        executor_to_append.custom_info["side"] = row["side"]
+        executor_values.append(executor_to_append)
+    return executor_values
+
+
+def time_best(function, repeats: int):
+    run_times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        run_times.append(time.perf_counter() - start)
+    return result, min(run_times)
+
+
+def benchmark_enums(data_source: PerformanceDataSource, repeats: int):
+    executors_df = data_source.executors_df
+    legacy, legacy_time = time_best(lambda: legacy_apply_special_data_types(data_source, executors_df.copy()), repeats)
+    columnar, columnar_time = time_best(lambda: data_source.apply_special_data_types(executors_df.copy()), repeats)
+    for column in ENUM_COLUMNS:
+        assert (legacy[column] == columnar[column].astype(object)).all(), column
+    legacy_memory = legacy[ENUM_COLUMNS].memory_usage(deep=True, index=False).sum()
+    columnar_memory = columnar[ENUM_COLUMNS].memory_usage(deep=True, index=False).sum()
+    print(f"enum decoding: per-row {legacy_time:.3f}s, lookup {columnar_time:.3f}s, "
+          f"speed-up {legacy_time / columnar_time:.1f}x | memory {legacy_memory / 1024 ** 2:.1f} MB objects vs "
+          f"{columnar_memory / 1024 ** 2:.1f} MB categoricals, same results")
+
+
+def assert_same_results(expected: dict, results: dict):
+    assert expected.keys() == results.keys()
+    for key, value in expected.items():
+        if isinstance(value, float):
+            assert np.isclose(value, results[key]), key
+        else:
+            assert value == results[key], key
+
+
+def benchmark_executor_info(data_source: PerformanceDataSource, repeats: int):
+    summarize_results = BacktestingEngineBase.summarize_results
+    legacy, legacy_time = time_best(lambda: summarize_results(legacy_executor_info_list(data_source)), repeats)
+    validated, validated_time = time_best(lambda: summarize_results(data_source.get_executor_info_list()), repeats)
+    constructed, constructed_time = time_best(
+        lambda: summarize_results(data_source.get_executor_info_list(validate=False)), repeats)
+    columns, columns_time = time_best(data_source.summarize_results_from_columns, repeats)
+    for results in [validated, constructed, columns]:
+        assert_same_results(legacy, results)
+    print(f"summarize results: iterrows {legacy_time:.3f}s, columns {validated_time:.3f}s "
+          f"({legacy_time / validated_time:.1f}x), without validation {constructed_time:.3f}s "
+          f"({legacy_time / constructed_time:.1f}x), from columns {columns_time:.3f}s "
+          f"({legacy_time / columns_time:.1f}x), same results")
+
+
+def benchmark(n_executors: int, repeats: int):
+    data_source = PerformanceDataSource(generate_executors(n_executors))
+    legacy, legacy_time = time_best(lambda: legacy_executors_df(data_source), repeats)
+    columnar, columnar_time = time_best(lambda: data_source.executors_df, repeats)
+    pd.testing.assert_frame_equal(legacy, columnar, check_dtype=False)
+    print(f"{n_executors} executors: per-row {legacy_time:.3f}s, columnar {columnar_time:.3f}s, "
+          f"speed-up {legacy_time / columnar_time:.1f}x, same results")
+    benchmark_enums(data_source, repeats)
+    benchmark_executor_info(data_source, repeats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--executors", type=int, default=100000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    benchmark(args.executors, args.repeats)
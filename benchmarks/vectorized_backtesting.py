@@ -0,0 +1,116 @@
+"""
+Compares the standard and the vectorized backtesting of directional controllers over synthetic candles.
+
+    python -m benchmarks.vectorized_backtesting --days 30 --repeats 3
+
+The candles are written to a temporary candles store, so the benchmark doesn't download anything. Both paths must
+report the same executors count and close types, and net pnls within `--pnl-tolerance`, or the benchmark fails.
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic_data import populate_candles_store
+from services.backtesting_data_provider import create_backtesting_engine
+from services.backtesting_service import run_backtesting
+from services.candles_store import HistoricalCandlesStore
+
+CONNECTOR_NAME = "binance_perpetual"
+TRADING_PAIR = "BTC-USDT"
+START_TIME = 1704067200  # 2024-01-01 00:00:00
+
+CONTROLLER_CONFIGS = {
+    "bollinger_v1": {
+        "controller_type": "directional_trading",
+        "controller_name": "bollinger_v1",
+        "connector_name": CONNECTOR_NAME,
+        "trading_pair": TRADING_PAIR,
+        "total_amount_quote": 1000,
+        "max_executors_per_side": 2,
+        "cooldown_time": 300,
+        "stop_loss": 0.01,
+        "take_profit": 0.005,
+        "time_limit": 3600,
+        "interval": "3m",
+        "bb_length": 100,
+        "bb_std": 2.0,
+    },
+    "macd_bb_v1": {
+        "controller_type": "directional_trading",
+        "controller_name": "macd_bb_v1",
+        "connector_name": CONNECTOR_NAME,
+        "trading_pair": TRADING_PAIR,
+        "total_amount_quote": 1000,
+        "max_executors_per_side": 2,
+        "cooldown_time": 300,
+        "stop_loss": 0.01,
+        "take_profit": 0.005,
+        "time_limit": 3600,
+        "interval": "3m",
+    },
+    "supertrend_v1": {
+        "controller_type": "directional_trading",
+        "controller_name": "supertrend_v1",
+        "connector_name": CONNECTOR_NAME,
+        "trading_pair": TRADING_PAIR,
+        "total_amount_quote": 1000,
+        "max_executors_per_side": 2,
+        "cooldown_time": 300,
+        "stop_loss": 0.01,
+        "take_profit": 0.005,
+        "time_limit": 3600,
+        "interval": "3m",
+    },
+}
+
+
+async def no_trading_rules(connector_name: str):
+    pass
+
+
+def assert_same_results(standard: dict, vectorized: dict, pnl_tolerance: float):
+    assert standard["total_executors"] == vectorized["total_executors"], "total_executors"
+    assert standard["close_types"] == vectorized["close_types"], "close_types"
+    assert np.isclose(standard["net_pnl_quote"], vectorized["net_pnl_quote"], rtol=0, atol=pnl_tolerance), "net_pnl_quote"
+
+
+async def benchmark(days: int, repeats: int, pnl_tolerance: float):
+    end_time = START_TIME + days * 24 * 60 * 60
+    with tempfile.TemporaryDirectory() as candles_store_path:
+        candles_store = HistoricalCandlesStore(base_path=candles_store_path)
+        # One extra day before the start covers the candles buffer of the indicators.
+        populate_candles_store(candles_store, CONNECTOR_NAME, TRADING_PAIR, START_TIME - 24 * 60 * 60, end_time)
+        backtesting_engine = create_backtesting_engine(candles_store)
+        backtesting_engine.backtesting_data_provider.initialize_trading_rules = no_trading_rules
+
+        for controller_name, controller_config in CONTROLLER_CONFIGS.items():
+            wall_times = {}
+            results = {}
+            for vectorized in (False, True):
+                backtesting_config = {"start_time": START_TIME, "end_time": end_time, "backtesting_resolution": "1m",
+                                      "trade_cost": 0.0006, "config": controller_config, "vectorized": vectorized}
+                run_times = []
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    backtesting_results = await run_backtesting(backtesting_engine, backtesting_config)
+                    run_times.append(time.perf_counter() - start)
+                wall_times[vectorized] = min(run_times)
+                results[vectorized] = backtesting_results["results"]
+            pnl_difference = abs(results[True]["net_pnl_quote"] - results[False]["net_pnl_quote"])
+            print(f"{controller_name}: standard {wall_times[False]:.3f}s, vectorized {wall_times[True]:.3f}s, "
+                  f"speed-up {wall_times[False] / wall_times[True]:.1f}x | executors "
+                  f"{results[False]['total_executors']} vs {results[True]['total_executors']}, "
+                  f"net pnl difference {pnl_difference:.8f}")
+            assert_same_results(results[False], results[True], pnl_tolerance)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--pnl-tolerance", type=float, default=1e-6, help="net pnl difference allowed, in quote")
+    args = parser.parse_args()
+    asyncio.run(benchmark(args.days, args.repeats, args.pnl_tolerance))
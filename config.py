@@ -6,10 +6,27 @@ load_dotenv()
 
 CONTROLLERS_PATH = "bots/conf/controllers"
 CONTROLLERS_MODULE = "bots.controllers"
+CANDLES_STORE_PATH = "bots/data/candles"
+CANDLES_DATASETS_PATH = "bots/data/candles_datasets"
+BACKTESTING_CACHE_PATH = "bots/data/backtesting_cache"
 CONFIG_PASSWORD = os.getenv("CONFIG_PASSWORD", "a")
 BROKER_HOST = os.getenv("BROKER_HOST", "localhost")
 BROKER_PORT = int(os.getenv("BROKER_PORT", 1883))
 BROKER_USERNAME = os.getenv("BROKER_USERNAME", "admin")
 BROKER_PASSWORD = os.getenv("BROKER_PASSWORD", "password")
 PASSWORD_VERIFICATION_PATH = "bots/credentials/master_account/.password_verification"
-BANNED_TOKENS = os.getenv("BANNED_TOKENS", "NAV,ARS,ETHW,ETHF").split(",")
\ No newline at end of file
+BANNED_TOKENS = os.getenv("BANNED_TOKENS", "NAV,ARS,ETHW,ETHF").split(",")
+CANDLES_FEEDS_MAX_FEEDS = int(os.getenv("CANDLES_FEEDS_MAX_FEEDS", 20))
+CANDLES_FEEDS_IDLE_TTL = int(os.getenv("CANDLES_FEEDS_IDLE_TTL", 300))
+CANDLES_FEEDS_READY_TIMEOUT = float(os.getenv("CANDLES_FEEDS_READY_TIMEOUT", 60))
+CANDLES_MAX_CONCURRENT_REQUESTS_PER_CONNECTOR = int(os.getenv("CANDLES_MAX_CONCURRENT_REQUESTS_PER_CONNECTOR", 5))
+CANDLES_DOWNLOAD_REQUESTS_PER_SECOND = float(os.getenv("CANDLES_DOWNLOAD_REQUESTS_PER_SECOND", 5))
+CANDLES_DOWNLOAD_CHUNK_SIZE = int(os.getenv("CANDLES_DOWNLOAD_CHUNK_SIZE", 1000))
+BACKTESTING_MAX_WORKERS = int(os.getenv("BACKTESTING_MAX_WORKERS", max((os.cpu_count() or 2) // 2, 1)))
+BACKTESTING_CACHE_MAX_SIZE_MB = int(os.getenv("BACKTESTING_CACHE_MAX_SIZE_MB", 1024))
+CANDLES_DATASETS_MAX_SIZE_MB = int(os.getenv("CANDLES_DATASETS_MAX_SIZE_MB", 2048))
+MONTE_CARLO_MAX_SIMULATIONS = int(os.getenv("MONTE_CARLO_MAX_SIMULATIONS", 100000))
+BACKTESTING_JOB_TIMEOUT = int(os.getenv("BACKTESTING_JOB_TIMEOUT", 3600))
+BACKTESTING_JOB_MAX_RSS_MB = int(os.getenv("BACKTESTING_JOB_MAX_RSS_MB", 4096))
+BACKTESTING_JOB_MAX_CANDLES = int(os.getenv("BACKTESTING_JOB_MAX_CANDLES", 2000000))
+BACKTESTING_SWEEP_MAX_COMBINATIONS = int(os.getenv("BACKTESTING_SWEEP_MAX_COMBINATIONS", 1000))
@@ -1,15 +1,52 @@
-from typing import Dict, Union
+import json
+from typing import Any, Dict, List, Optional, Union
 
-from fastapi import APIRouter
-from hummingbot.data_feed.candles_feed.candles_factory import CandlesFactory
-from hummingbot.strategy_v2.backtesting.backtesting_engine_base import BacktestingEngineBase
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from config import CONTROLLERS_MODULE, CONTROLLERS_PATH
+from config import (
+    BACKTESTING_CACHE_MAX_SIZE_MB,
+    BACKTESTING_CACHE_PATH,
+    BACKTESTING_JOB_MAX_CANDLES,
+    BACKTESTING_JOB_MAX_RSS_MB,
+    BACKTESTING_JOB_TIMEOUT,
+    BACKTESTING_MAX_WORKERS,
+    BACKTESTING_SWEEP_MAX_COMBINATIONS,
+    CANDLES_DATASETS_MAX_SIZE_MB,
+    CANDLES_DATASETS_PATH,
+    CANDLES_DOWNLOAD_CHUNK_SIZE,
+    CANDLES_DOWNLOAD_REQUESTS_PER_SECOND,
+    CANDLES_MAX_CONCURRENT_REQUESTS_PER_CONNECTOR,
+    CANDLES_STORE_PATH,
+    MONTE_CARLO_MAX_SIMULATIONS,
+)
+from services.backtesting_cache import BacktestingResultsCache
+from services.backtesting_jobs import BacktestingJobManager
+from services.backtesting_monte_carlo import run_monte_carlo
+from services.backtesting_sweep import expand_parameters, run_parameter_sweep
+from services.backtesting_walk_forward import get_walk_forward_windows, run_walk_forward
+from services.candles_datasets import CandlesDatasetManager
+from services.candles_store import HistoricalCandlesStore
+from utils.dataframe_responses import dataframe_response, get_response_format
 
 router = APIRouter(tags=["Market Backtesting"])
-candles_factory = CandlesFactory()
-backtesting_engine = BacktestingEngineBase()
+candles_store = HistoricalCandlesStore(
+    base_path=CANDLES_STORE_PATH,
+    max_concurrent_requests_per_connector=CANDLES_MAX_CONCURRENT_REQUESTS_PER_CONNECTOR,
+    requests_per_second=CANDLES_DOWNLOAD_REQUESTS_PER_SECOND,
+    download_chunk_size=CANDLES_DOWNLOAD_CHUNK_SIZE)
+candles_datasets_manager = CandlesDatasetManager(candles_store, base_path=CANDLES_DATASETS_PATH,
+                                                 max_size_bytes=CANDLES_DATASETS_MAX_SIZE_MB * 1024 * 1024)
+backtesting_results_cache = BacktestingResultsCache(base_path=BACKTESTING_CACHE_PATH,
+                                                    max_size_bytes=BACKTESTING_CACHE_MAX_SIZE_MB * 1024 * 1024)
+backtesting_job_manager = BacktestingJobManager(max_workers=BACKTESTING_MAX_WORKERS, candles_store_path=CANDLES_STORE_PATH,
+                                                datasets_manager=candles_datasets_manager,
+                                                results_cache=backtesting_results_cache,
+                                                job_timeout=BACKTESTING_JOB_TIMEOUT,
+                                                job_max_rss_bytes=BACKTESTING_JOB_MAX_RSS_MB * 1024 * 1024,
+                                                max_candles=BACKTESTING_JOB_MAX_CANDLES)
 
 
 class BacktestingConfig(BaseModel):
@@ -18,35 +55,241 @@ class BacktestingConfig(BaseModel):
     backtesting_resolution: str = "1m"
     trade_cost: float = 0.0006
     config: Union[Dict, str]
+    force_recompute: bool = False
+    vectorized: bool = False  # fast path for directional controllers with market-entry triple barrier executors
+    include_processed_data: bool = True
+    processed_data_columns: Optional[List[str]] = None  # the timestamp is always included
+    processed_data_interval: Optional[str] = None  # e.g. "1h", aggregating the candles columns as OHLCV
+    processed_data_max_points: Optional[int] = None
+
+
+class BacktestingSweepConfig(BacktestingConfig):
+    parameters: Dict[str, Union[List[Any], Dict[str, Union[int, float]]]]  # values list or {"start", "stop", "step"}
+    search: str = "grid"  # grid or random
+    n_samples: Optional[int] = None
+    seed: Optional[int] = None
+    max_combinations: int = 1000
+    sort_by: str = "net_pnl_quote"
+    ascending: bool = False
+
+
+class BacktestingWalkForwardConfig(BacktestingSweepConfig):
+    train_duration: int  # seconds
+    test_duration: int  # seconds
+    step: Optional[int] = None  # seconds, defaults to the test duration
+    anchored: bool = False
+
+
+class BacktestingPortfolioConfig(BaseModel):
+    start_time: int = 1672542000  # 2023-01-01 00:00:00
+    end_time: int = 1672628400  # 2023-01-01 23:59:00
+    backtesting_resolution: str = "1m"
+    trade_cost: float = 0.0006
+    configs: List[Union[Dict, str]]
+    max_global_drawdown: Optional[float] = None  # quote, stops every controller
+    max_controller_drawdown: Optional[float] = None  # quote, stops the controller
+    vectorized: bool = False
+    max_points: int = 1000  # of the equity curves
+
+
+class BacktestingMonteCarloConfig(BaseModel):
+    executors: Union[List[Dict], Dict[str, List]]  # from a backtesting result or a performance results payload
+    method: str = "bootstrap"  # bootstrap or permutation
+    n_simulations: int = 10000
+    seed: Optional[int] = None
+    total_amount_quote: float = 1000
+    bins: int = 50
+
+
+@router.on_event("shutdown")
+async def shutdown_event():
+    backtesting_job_manager.shutdown()
+
+
+def backtesting_response(backtesting_results: Dict, request: Request):
+    """
+    Returns the backtesting results as Arrow or msgpack when the client asks for it in the Accept header, JSON
+    otherwise.
+    """
+    processed_data = backtesting_results["processed_data"]
+    response = dataframe_response(processed_data, get_response_format(request.headers.get("accept")),
+                                  metadata={"executors": backtesting_results["executors"],
+                                            "results": backtesting_results["results"]})
+    if response is not None:
+        return response
+    return {
+        "executors": backtesting_results["executors"],
+        "processed_data": processed_data.to_dict(),
+        "results": backtesting_results["results"],
+    }
 
 
 @router.post("/run-backtesting")
-async def run_backtesting(backtesting_config: BacktestingConfig):
-    try:
-        if isinstance(backtesting_config.config, str):
-            controller_config = backtesting_engine.get_controller_config_instance_from_yml(
-                config_path=backtesting_config.config,
-                controllers_conf_dir_path=CONTROLLERS_PATH,
-                controllers_module=CONTROLLERS_MODULE
-            )
-        else:
-            controller_config = backtesting_engine.get_controller_config_instance_from_dict(
-                config_data=backtesting_config.config,
-                controllers_module=CONTROLLERS_MODULE
-            )
-        backtesting_results = await backtesting_engine.run_backtesting(
-            controller_config=controller_config, trade_cost=backtesting_config.trade_cost,
-            start=int(backtesting_config.start_time), end=int(backtesting_config.end_time),
-            backtesting_resolution=backtesting_config.backtesting_resolution)
-        processed_data = backtesting_results["processed_data"]["features"].fillna(0)
-        executors_info = [e.to_dict() for e in backtesting_results["executors"]]
-        backtesting_results["processed_data"] = processed_data.to_dict()
-        results = backtesting_results["results"]
-        results["sharpe_ratio"] = results["sharpe_ratio"] if results["sharpe_ratio"] is not None else 0
-        return {
-            "executors": executors_info,
-            "processed_data": backtesting_results["processed_data"],
-            "results": backtesting_results["results"],
-        }
+async def run_backtesting(backtesting_config: BacktestingConfig, request: Request):
+    """
+    Runs a backtest on the backtesting process pool, within the job limits, and returns its results.
+    """
+    try:
+        backtesting_results = await backtesting_job_manager.run(backtesting_config.model_dump())
+        return backtesting_response(backtesting_results, request)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@router.post("/stream-backtesting")
+async def stream_backtesting(backtesting_config: BacktestingConfig, request: Request, executors_batch_size: int = 100):
+    """
+    Server-sent events stream of a backtest run on the backtesting process pool. It sends a `job` event with the job
+    id, `progress` events with the percent of candles processed, `executors` events with batches of the executors as
+    they close and a final `results` event with the summary (or an `error` event).
+    """
+    async def event_stream():
+        events = backtesting_job_manager.stream(backtesting_config.model_dump(),
+                                                executors_batch_size=executors_batch_size)
+        try:
+            async for event, data in events:
+                yield f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+                if await request.is_disconnected():
+                    break
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@router.get("/backtesting-cache")
+async def get_backtesting_cache_status():
+    return backtesting_results_cache.get_status()
+
+
+@router.get("/candles-datasets")
+async def get_candles_datasets_status():
+    return candles_datasets_manager.get_status()
+
+
+@router.post("/submit-backtesting-job")
+async def submit_backtesting_job(backtesting_config: BacktestingConfig):
+    """
+    Queues a backtest to run on the backtesting process pool and returns its job id.
+    """
+    try:
+        return {"job_id": backtesting_job_manager.submit(backtesting_config.model_dump())}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/backtesting-jobs")
+async def get_backtesting_jobs():
+    return backtesting_job_manager.get_jobs_status()
+
+
+@router.get("/backtesting-job-status/{job_id}")
+async def get_backtesting_job_status(job_id: str):
+    try:
+        return backtesting_job_manager.get_job_status(job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+@router.get("/backtesting-job-result/{job_id}")
+async def get_backtesting_job_result(job_id: str, request: Request):
+    try:
+        return backtesting_response(backtesting_job_manager.get_job_result(job_id), request)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/cancel-backtesting-job/{job_id}")
+async def cancel_backtesting_job(job_id: str):
+    """
+    Cancels a pending job or interrupts a running one. Its status is "cancelling" until the worker stops it.
+    """
+    try:
+        return {"cancelled": backtesting_job_manager.cancel_job(job_id)}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+def check_max_combinations(sweep_config: BacktestingSweepConfig):
+    if not 1 <= sweep_config.max_combinations <= BACKTESTING_SWEEP_MAX_COMBINATIONS:
+        raise HTTPException(status_code=400,
+                            detail=f"max_combinations must be between 1 and {BACKTESTING_SWEEP_MAX_COMBINATIONS}")
+
+
+@router.post("/run-backtesting-sweep")
+async def run_backtesting_sweep(sweep_config: BacktestingSweepConfig):
+    """
+    Backtests the base controller config with every combination of the parameters (grid or random search) in parallel
+    and returns the results summaries ranked by `sort_by`.
+    """
+    check_max_combinations(sweep_config)
+    try:
+        combinations = expand_parameters(sweep_config.parameters, search=sweep_config.search,
+                                         n_samples=sweep_config.n_samples, seed=sweep_config.seed,
+                                         max_combinations=sweep_config.max_combinations)
+        backtesting_config = sweep_config.model_dump(include=set(BacktestingConfig.model_fields))
+        ranking = await run_parameter_sweep(backtesting_job_manager, backtesting_config, combinations,
+                                            sort_by=sweep_config.sort_by, ascending=sweep_config.ascending)
+        return {"total_combinations": len(combinations), "results": ranking}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@router.post("/run-backtesting-walk-forward")
+async def run_backtesting_walk_forward(walk_forward_config: BacktestingWalkForwardConfig):
+    """
+    Splits the time range into rolling train and test windows, sweeps the parameters on each train window and
+    backtests the best combination on the next test window. Returns the windows and the aggregated out-of-sample
+    results.
+    """
+    check_max_combinations(walk_forward_config)
+    try:
+        combinations = expand_parameters(walk_forward_config.parameters, search=walk_forward_config.search,
+                                         n_samples=walk_forward_config.n_samples, seed=walk_forward_config.seed,
+                                         max_combinations=walk_forward_config.max_combinations)
+        windows = get_walk_forward_windows(walk_forward_config.start_time, walk_forward_config.end_time,
+                                           walk_forward_config.train_duration, walk_forward_config.test_duration,
+                                           step=walk_forward_config.step, anchored=walk_forward_config.anchored)
+        backtesting_config = walk_forward_config.model_dump(include=set(BacktestingConfig.model_fields))
+        return await run_walk_forward(backtesting_job_manager, backtesting_config, combinations, windows,
+                                      sort_by=walk_forward_config.sort_by, ascending=walk_forward_config.ascending)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@router.post("/run-backtesting-portfolio")
+async def run_backtesting_portfolio(portfolio_config: BacktestingPortfolioConfig):
+    """
+    Backtests several controllers together over the same period, applying the max controller and global drawdowns
+    like the v2_with_controllers script. Returns the per-controller and combined results with their equity curves.
+    """
+    if not portfolio_config.configs:
+        raise HTTPException(status_code=400, detail="At least one controller config is required")
+    if portfolio_config.max_points < 2:
+        raise HTTPException(status_code=400, detail="max_points must be at least 2")
+    try:
+        return await backtesting_job_manager.run_portfolio(portfolio_config.model_dump())
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@router.post("/run-monte-carlo")
+async def run_backtesting_monte_carlo(monte_carlo_config: BacktestingMonteCarloConfig):
+    """
+    Resamples (bootstrap) or reorders (permutation) the executors trades thousands of times and returns the
+    distributions of the final pnl, max drawdown and sharpe ratio. Pass the returned seed to reproduce a run.
+    """
+    if not 1 <= monte_carlo_config.n_simulations <= MONTE_CARLO_MAX_SIMULATIONS:
+        raise HTTPException(status_code=400,
+                            detail=f"n_simulations must be between 1 and {MONTE_CARLO_MAX_SIMULATIONS}")
+    try:
+        return await run_monte_carlo(backtesting_job_manager, monte_carlo_config.executors,
+                                     method=monte_carlo_config.method, n_simulations=monte_carlo_config.n_simulations,
+                                     seed=monte_carlo_config.seed, total_amount_quote=monte_carlo_config.total_amount_quote,
+                                     bins=monte_carlo_config.bins)
     except Exception as e:
         return {"error": str(e)}
@@ -1,37 +1,202 @@
 import asyncio
+import json
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter
-from hummingbot.data_feed.candles_feed.candles_factory import CandlesFactory
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from hummingbot.data_feed.candles_feed.data_types import CandlesConfig, HistoricalCandlesConfig
+from pydantic import BaseModel
+
+from config import (
+    CANDLES_DOWNLOAD_CHUNK_SIZE,
+    CANDLES_DOWNLOAD_REQUESTS_PER_SECOND,
+    CANDLES_FEEDS_IDLE_TTL,
+    CANDLES_FEEDS_MAX_FEEDS,
+    CANDLES_FEEDS_READY_TIMEOUT,
+    CANDLES_MAX_CONCURRENT_REQUESTS_PER_CONNECTOR,
+    CANDLES_STORE_PATH,
+)
+from services.candles_feed_manager import CandlesFeedManager
+from services.candles_store import HistoricalCandlesStore
+from services.indicators_service import IndicatorsService
+from services.request_coalescer import RequestCoalescer
+from utils.dataframe_responses import dataframe_response, get_response_format
 
 router = APIRouter(tags=["Market Data"])
-candles_factory = CandlesFactory()
+candles_feed_manager = CandlesFeedManager(max_feeds=CANDLES_FEEDS_MAX_FEEDS, idle_ttl=CANDLES_FEEDS_IDLE_TTL)
+candles_store = HistoricalCandlesStore(
+    base_path=CANDLES_STORE_PATH,
+    max_concurrent_requests_per_connector=CANDLES_MAX_CONCURRENT_REQUESTS_PER_CONNECTOR,
+    requests_per_second=CANDLES_DOWNLOAD_REQUESTS_PER_SECOND,
+    download_chunk_size=CANDLES_DOWNLOAD_CHUNK_SIZE)
+request_coalescer = RequestCoalescer()
+indicators_service = IndicatorsService()
+
+
+class IndicatorConfig(BaseModel):
+    name: str  # bbands, macd, natr or supertrend
+    params: Dict[str, Any] = {}
+
+
+class IndicatorsRequest(BaseModel):
+    candles_config: CandlesConfig
+    indicators: List[IndicatorConfig]
+
+
+@router.on_event("startup")
+async def startup_event():
+    candles_feed_manager.start_cleanup_loop()
+
+
+@router.on_event("shutdown")
+async def shutdown_event():
+    candles_feed_manager.stop_cleanup_loop()
+
+
+def get_historical_candles_coalesced(config: HistoricalCandlesConfig):
+    key = ("historical_candles", config.connector_name, config.trading_pair, config.interval, config.start_time,
+           config.end_time)
+    return request_coalescer.run(key, lambda: candles_store.get_historical_candles(config), metric="historical_candles")
+
+
+async def _get_ready_candles_df(candles_config: CandlesConfig, timeout: float):
+    async with candles_feed_manager.feed(candles_config) as candles:
+        await candles.wait_until_ready(timeout=timeout)
+        return candles.candles_df.drop_duplicates(subset=["timestamp"])
+
+
+def candles_response(df, request: Request):
+    """
+    Returns the candles as Arrow or msgpack when the client asks for it in the Accept header, JSON otherwise.
+    """
+    response = dataframe_response(df, get_response_format(request.headers.get("accept")))
+    return response if response is not None else df
 
 
 @router.post("/real-time-candles")
-async def get_candles(candles_config: CandlesConfig):
+async def get_candles(candles_config: CandlesConfig, request: Request, timeout: Optional[float] = None):
+    timeout = timeout or CANDLES_FEEDS_READY_TIMEOUT
     try:
-        candles = candles_factory.get_candle(candles_config)
-        candles.start()
-        while not candles.ready:
-            await asyncio.sleep(1)
-        df = candles.candles_df
-        candles.stop()
-        df.drop_duplicates(subset=["timestamp"], inplace=True)
-        return df
+        key = ("real_time_candles", *candles_feed_manager.get_feed_key(candles_config))
+        df = await request_coalescer.run(key, lambda: _get_ready_candles_df(candles_config, timeout),
+                                         metric="real_time_candles")
+        return candles_response(df, request)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Candles feed was not ready after {timeout} seconds")
     except Exception as e:
         return {"error": str(e)}
 
 
+@router.post("/stream-candles")
+async def stream_candles(candles_config: CandlesConfig, request: Request, only_closed: bool = False,
+                         heartbeat_interval: float = 15):
+    """
+    Server-sent events stream of a live candles feed. The first event holds the current candles and the next ones only
+    the candles that were added or updated since the last event. With `only_closed` a candle is sent once it closes.
+    """
+    async def event_stream():
+        try:
+            feed = candles_feed_manager.acquire(candles_config)
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+            return
+        try:
+            await feed.wait_until_ready(timeout=CANDLES_FEEDS_READY_TIMEOUT)
+            last_sent_timestamp = None
+            last_sent_row = None
+            version = feed.update_version
+            while not await request.is_disconnected():
+                df = feed.candles_df.drop_duplicates(subset=["timestamp"])
+                if only_closed:
+                    df = df.iloc[:-1]
+                if last_sent_timestamp is not None:
+                    df = df[df["timestamp"] > last_sent_timestamp] if only_closed else \
+                        df[df["timestamp"] >= last_sent_timestamp]
+                if not df.empty and (len(df) > 1 or tuple(df.iloc[-1]) != last_sent_row):
+                    yield f"data: {df.to_json(orient='records')}\n\n"
+                    last_sent_timestamp = df["timestamp"].iloc[-1]
+                    last_sent_row = tuple(df.iloc[-1])
+                try:
+                    version = await asyncio.wait_for(feed.wait_for_update(version), timeout=heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+        except asyncio.TimeoutError:
+            yield f"event: error\ndata: {json.dumps({'error': 'Candles feed was not ready'})}\n\n"
+        finally:
+            candles_feed_manager.release(feed)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@router.post("/indicators")
+async def get_indicators(indicators_request: IndicatorsRequest, timeout: Optional[float] = None):
+    """
+    Computes the requested indicators over the live candles of the config. Results are cached, so a refresh after a
+    new candle only recomputes the tail of each indicator.
+    """
+    timeout = timeout or CANDLES_FEEDS_READY_TIMEOUT
+    candles_config = indicators_request.candles_config
+    try:
+        key = ("real_time_candles", *candles_feed_manager.get_feed_key(candles_config))
+        candles_df = await request_coalescer.run(key, lambda: _get_ready_candles_df(candles_config, timeout),
+                                                 metric="real_time_candles")
+        indicators = []
+        for indicator in indicators_request.indicators:
+            result = indicators_service.get_indicator(candles_feed_manager.get_feed_key(candles_config),
+                                                      candles_df, indicator.name, indicator.params)
+            indicators.append({"name": indicator.name, "params": indicator.params,
+                               "data": json.loads(result.to_json(orient="records"))})
+        return {"indicators": indicators}
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Candles feed was not ready after {timeout} seconds")
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@router.get("/candles-feeds")
+async def get_candles_feeds():
+    return candles_feed_manager.get_feeds_status()
+
+
+@router.get("/historical-candles-downloads")
+async def get_historical_candles_downloads():
+    return candles_store.download_planner.get_downloads_progress()
+
+
+@router.get("/candles-requests-metrics")
+async def get_candles_requests_metrics():
+    return {**request_coalescer.get_metrics(), "indicators": indicators_service.get_metrics()}
+
+
 @router.post("/historical-candles")
-async def get_historical_candles(config: HistoricalCandlesConfig):
+async def get_historical_candles(config: HistoricalCandlesConfig, request: Request):
     try:
-        candles_config = CandlesConfig(
-            connector=config.connector_name,
-            trading_pair=config.trading_pair,
-            interval=config.interval
-        )
-        candles = candles_factory.get_candle(candles_config)
-        return await candles.get_historical_candles(config=config)
+        df = await get_historical_candles_coalesced(config)
+        return candles_response(df, request)
     except Exception as e:
         return {"error": str(e)}
+
+
+@router.post("/historical-candles-batch")
+async def get_historical_candles_batch(configs: List[HistoricalCandlesConfig]):
+    """
+    Fetches the candles of several configs concurrently. Exchange requests are limited per connector by the candles
+    store, and each entry of the response reports its own candles or error.
+    """
+    results = await asyncio.gather(*[get_historical_candles_coalesced(config) for config in configs],
+                                   return_exceptions=True)
+    response = []
+    for config, result in zip(configs, results):
+        entry = {
+            "connector_name": config.connector_name,
+            "trading_pair": config.trading_pair,
+            "interval": config.interval,
+            "start_time": config.start_time,
+            "end_time": config.end_time,
+        }
+        if isinstance(result, Exception):
+            entry["error"] = str(result)
+        else:
+            entry["candles"] = result
+        response.append(entry)
+    return response
@@ -14,9 +14,12 @@ async def get_performance_results(payload: Dict[str, Any]):
     data_source = PerformanceDataSource(executors)
     performance_results = {}
     try:
-        backtesting_engine = BacktestingEngineBase()
-        executor_info_list = data_source.executor_info_list
-        performance_results["results"] = backtesting_engine.summarize_results(executor_info_list    )
+        if payload.get("summarize_from_columns", False):
+            performance_results["results"] = data_source.summarize_results_from_columns()
+        else:
+            backtesting_engine = BacktestingEngineBase()
+            executor_info_list = data_source.get_executor_info_list(validate=payload.get("validate_executors", True))
+            performance_results["results"] = backtesting_engine.summarize_results(executor_info_list)
         results = performance_results["results"]
         results["sharpe_ratio"] = results["sharpe_ratio"] if results["sharpe_ratio"] is not None else 0
         return {
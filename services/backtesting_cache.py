@@ -0,0 +1,85 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+from typing import Any, Dict, Optional
+
+
+class BacktestingResultsCache:
+    """
+    Content-addressed on-disk cache of backtesting results. The key is a hash of the normalized controller config and
+    the backtesting parameters, so identical backtests return the stored results. When the cache grows over
+    `max_size_bytes` the least recently used results are removed.
+    """
+
+    def __init__(self, base_path: str = "bots/data/backtesting_cache", max_size_bytes: int = 1024 * 1024 * 1024):
+        self.base_path = base_path
+        self.max_size_bytes = max_size_bytes
+
+    @staticmethod
+    def get_key(controller_config, start_time: int, end_time: int, backtesting_resolution: str,
+                trade_cost: float, vectorized: bool = False) -> str:
+        # The id is random when not provided, so it is not part of the content.
+        normalized_config = controller_config.model_dump(mode="json", exclude={"id"})
+        content = json.dumps({
+            "config": normalized_config,
+            "start_time": int(start_time),
+            "end_time": int(end_time),
+            "backtesting_resolution": backtesting_resolution,
+            "trade_cost": float(trade_cost),
+            "vectorized": vectorized,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.base_path, f"{key}.pkl")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._get_path(key)
+        try:
+            with open(path, "rb") as f:
+                results = pickle.load(f)
+            # The modification time is used as the last access time for the LRU eviction.
+            os.utime(path)
+            return results
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.error(f"Error reading cached backtesting results {key}: {e}")
+            return None
+
+    def set(self, key: str, results: Dict[str, Any]):
+        os.makedirs(self.base_path, exist_ok=True)
+        tmp_path = os.path.join(self.base_path, f"tmp_{os.getpid()}_{key}.pkl")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._get_path(key))
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for file_name in os.listdir(self.base_path):
+            if not file_name.endswith(".pkl") or file_name.startswith("tmp_"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.base_path, file_name))
+                entries.append((stat.st_mtime, stat.st_size, file_name))
+            except FileNotFoundError:
+                continue
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, file_name in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.base_path, file_name))
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+    def get_status(self) -> Dict[str, Any]:
+        if not os.path.exists(self.base_path):
+            return {"entries": 0, "size_bytes": 0, "max_size_bytes": self.max_size_bytes}
+        sizes = [os.path.getsize(os.path.join(self.base_path, f)) for f in os.listdir(self.base_path)
+                 if f.endswith(".pkl") and not f.startswith("tmp_")]
+        return {"entries": len(sizes), "size_bytes": sum(sizes), "max_size_bytes": self.max_size_bytes}
@@ -0,0 +1,73 @@
+from typing import Optional
+
+import pandas as pd
+from hummingbot.data_feed.candles_feed.candles_factory import CandlesFactory
+from hummingbot.data_feed.candles_feed.data_types import CandlesConfig, HistoricalCandlesConfig
+from hummingbot.strategy_v2.backtesting.backtesting_data_provider import BacktestingDataProvider
+
+from services.candles_datasets import CandlesDatasetManager
+from services.candles_store import HistoricalCandlesStore
+from services.streaming_backtesting_engine import StreamingBacktestingEngine
+
+
+class StoreBackedBacktestingDataProvider(BacktestingDataProvider):
+    """
+    Backtesting data provider that loads the candles through the local candles store, so ranges that were already
+    downloaded are read from disk and higher intervals are derived from the stored 1m candles when possible. With a
+    dataset manager the candles are attached memory-mapped, so parallel workers share one copy of each range.
+    """
+
+    def __init__(self, candles_store: HistoricalCandlesStore, datasets_manager: Optional[CandlesDatasetManager] = None,
+                 connectors=None):
+        super().__init__(connectors=connectors or {})
+        self.candles_store = candles_store
+        self.datasets_manager = datasets_manager
+
+    async def get_candles_feed(self, config: CandlesConfig):
+        key = self._generate_candle_feed_key(config)
+        existing_feed = self.candles_feeds.get(key, pd.DataFrame())
+        if not existing_feed.empty:
+            if existing_feed["timestamp"].min() <= self.start_time and existing_feed["timestamp"].max() >= self.end_time:
+                return existing_feed
+        historical_candles_config = self.get_historical_candles_config(config)
+        if self.datasets_manager is not None:
+            candles_df = await self.datasets_manager.get_candles(historical_candles_config)
+        else:
+            candles_df = await self.candles_store.get_historical_candles(historical_candles_config)
+        self.candles_feeds[key] = candles_df
+        return candles_df
+
+    def get_historical_candles_config(self, config: CandlesConfig) -> HistoricalCandlesConfig:
+        interval_in_seconds = self.candles_store.get_interval_in_seconds(config.interval)
+        if interval_in_seconds is None:
+            interval_in_seconds = CandlesFactory.get_candle(config).interval_in_seconds
+        candles_buffer = config.max_records * interval_in_seconds
+        return HistoricalCandlesConfig(
+            connector_name=config.connector,
+            trading_pair=config.trading_pair,
+            interval=config.interval,
+            start_time=self.start_time - candles_buffer,
+            end_time=self.end_time,
+        )
+
+    async def prefetch_candles(self, controller_config, start_time: int, end_time: int, backtesting_resolution: str):
+        """
+        Loads into the candles store the candles that a backtest of the controller over the range reads, without
+        running it nor keeping them in memory. The controller is created because it completes its candles config.
+        """
+        self.update_backtesting_time(start_time, end_time)
+        controller = controller_config.get_controller_class()(config=controller_config, market_data_provider=self,
+                                                              actions_queue=None)
+        candles_configs = [CandlesConfig(connector=controller_config.connector_name,
+                                         trading_pair=controller_config.trading_pair, interval=backtesting_resolution),
+                           *controller.config.candles_config]
+        for config in candles_configs:
+            await self.candles_store.get_historical_candles(self.get_historical_candles_config(config))
+
+
+def create_backtesting_engine(candles_store: HistoricalCandlesStore,
+                              datasets_manager: Optional[CandlesDatasetManager] = None) -> StreamingBacktestingEngine:
+    backtesting_engine = StreamingBacktestingEngine()
+    backtesting_engine.backtesting_data_provider = StoreBackedBacktestingDataProvider(
+        candles_store=candles_store, datasets_manager=datasets_manager)
+    return backtesting_engine
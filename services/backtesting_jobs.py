@@ -0,0 +1,503 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from services.backtesting_cache import BacktestingResultsCache
+from services.backtesting_data_provider import StoreBackedBacktestingDataProvider, create_backtesting_engine
+from services.backtesting_portfolio import run_portfolio_backtesting
+from services.backtesting_service import load_controller_config, run_backtesting
+from services.candles_datasets import CandlesDatasetManager
+from services.candles_store import INTERVALS_IN_SECONDS, HistoricalCandlesStore
+
+# State of each worker process, created once by the pool initializer and reused by all the jobs run in the worker.
+_worker_engine = None
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+_worker_results_cache: Optional[BacktestingResultsCache] = None
+# Job running in the worker and ids of the jobs the job manager asked to interrupt, shared with it.
+_worker_job_id: Optional[str] = None
+_worker_interrupted_jobs = None
+
+
+class BacktestingJobInterrupted(BaseException):
+    """
+    Raised in a worker when the job manager interrupts its job, because it was cancelled or went over a limit. It is a
+    BaseException, like KeyboardInterrupt, so the broad exception handlers of the job (e.g. the candles downloads
+    retries) don't swallow it.
+    """
+
+
+def _interrupt_job(signum, frame):
+    # Sent by the job manager to the worker. Ignored if the job it targeted finished in the meantime, even when the
+    # worker already started another one.
+    if _worker_job_id is not None and _worker_job_id in _worker_interrupted_jobs:
+        raise BacktestingJobInterrupted("Backtesting job interrupted")
+
+
+def get_process_private_rss_bytes(pid: int) -> Optional[int]:
+    """
+    Returns the resident memory of the process that is not shared, or None where procfs is not available. The shared
+    pages, e.g. of the memory-mapped candles datasets that every worker attaches, don't count.
+    """
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            _, resident, shared = f.read().split()[:3]
+        return (int(resident) - int(shared)) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _initialize_worker(candles_store_path: str, datasets_path: Optional[str], datasets_max_size: int,
+                       results_cache_path: Optional[str], results_cache_max_size: int):
+    global _worker_engine, _worker_loop, _worker_results_cache
+    _worker_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_worker_loop)
+    signal.signal(signal.SIGUSR1, _interrupt_job)
+    candles_store = HistoricalCandlesStore(base_path=candles_store_path)
+    datasets_manager = None
+    if datasets_path is not None:
+        # The workers attach the candles memory-mapped, so the first one to need a range publishes it for the rest.
+        datasets_manager = CandlesDatasetManager(candles_store, base_path=datasets_path,
+                                                 max_size_bytes=datasets_max_size)
+    _worker_engine = create_backtesting_engine(candles_store, datasets_manager)
+    if results_cache_path is not None:
+        _worker_results_cache = BacktestingResultsCache(base_path=results_cache_path,
+                                                        max_size_bytes=results_cache_max_size)
+
+
+def run_backtesting_job(backtesting_config: Dict[str, Any], summary_only: bool = False, events_queue=None,
+                        executors_batch_size: int = 100) -> Dict:
+    if events_queue is None:
+        backtesting_results = _worker_loop.run_until_complete(
+            run_backtesting(_worker_engine, backtesting_config, results_cache=_worker_results_cache))
+    else:
+        _worker_engine.set_events_callback(lambda event, data: events_queue.put((event, data)), executors_batch_size)
+        try:
+            backtesting_results = _worker_loop.run_until_complete(
+                run_backtesting(_worker_engine, backtesting_config, results_cache=_worker_results_cache))
+            if _worker_engine.streamed_rows == 0:
+                # The results came from the cache, so the engine didn't stream the executors.
+                _worker_engine.emit_executors(backtesting_results["executors"])
+                _worker_engine.emit_progress()
+        finally:
+            _worker_engine.set_events_callback(None)
+    if summary_only:
+        # Sweeps only rank the summaries, so the executors and processed data are not sent back to the API process.
+        return {"results": backtesting_results["results"]}
+    return backtesting_results
+
+
+def _run_job(job_id: str, running_jobs, interrupted_jobs, job_function: Callable, *args) -> Any:
+    global _worker_job_id, _worker_interrupted_jobs, _worker_loop
+    # Lets the job manager find the worker of the job to supervise it.
+    running_jobs[job_id] = {"pid": os.getpid(), "started_at": time.time()}
+    _worker_interrupted_jobs = interrupted_jobs
+    _worker_job_id = job_id
+    try:
+        return job_function(*args)
+    except BacktestingJobInterrupted:
+        # The job can be interrupted anywhere in the event loop, so the next jobs get a new one.
+        _worker_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_worker_loop)
+        raise
+    finally:
+        _worker_job_id = None
+        running_jobs.pop(job_id, None)
+
+
+def get_candles_count(backtesting_config: Dict[str, Any]) -> int:
+    """
+    Returns the number of candles of the backtesting resolution in the backtest time range.
+    """
+    resolution = backtesting_config.get("backtesting_resolution", "1m")
+    if resolution not in INTERVALS_IN_SECONDS:
+        raise ValueError(f"Unknown backtesting resolution {resolution}")
+    return int((backtesting_config["end_time"] - backtesting_config["start_time"]) // INTERVALS_IN_SECONDS[resolution])
+
+
+def prefetch_candles_job(backtesting_config: Dict[str, Any]):
+    # A provider of its own, so the prefetched candles are only written to the store and don't stay in the worker.
+    data_provider = StoreBackedBacktestingDataProvider(_worker_engine.backtesting_data_provider.candles_store)
+    controller_config = load_controller_config(_worker_engine, backtesting_config["config"])
+    _worker_loop.run_until_complete(data_provider.prefetch_candles(
+        controller_config, int(backtesting_config["start_time"]), int(backtesting_config["end_time"]),
+        backtesting_config.get("backtesting_resolution", "1m")))
+
+
+def run_portfolio_backtesting_job(portfolio_config: Dict[str, Any]) -> Dict:
+    # All the controllers run in the same worker, so the candles they share are loaded once.
+    return _worker_loop.run_until_complete(run_portfolio_backtesting(_worker_engine, portfolio_config))
+
+
+class BacktestingJobManager:
+    """
+    Runs backtests as jobs on a process pool so long backtests don't block the API event loop. Each worker process
+    owns its own backtesting engine, so concurrent jobs never share state. Jobs are kept in memory until
+    `max_finished_jobs` newer jobs have finished. Internal jobs, e.g. the backtests of a sweep or the chunks of an
+    analysis run with run_function, are supervised the same way but are not listed and are dropped once their result is
+    collected.
+
+    Jobs over `max_candles` are rejected when submitted. A supervisor thread interrupts the jobs running longer than
+    `job_timeout` seconds, with a worker private RSS over `job_max_rss_bytes` (where procfs is available) or cancelled,
+    and reports them as failed. A job still running `kill_grace_period` seconds after being interrupted, e.g. stuck in
+    native code, gets its worker killed. A limit of 0 disables it.
+
+    Killing a worker, or a worker dying on its own, breaks the whole pool, so the pool is rebuilt and the other jobs it
+    was running or holding are resubmitted, up to `max_job_resubmissions` times each. Each job has its own future,
+    resolved by the last of its attempts on the pool.
+    """
+
+    def __init__(self, max_workers: int = 2, candles_store_path: str = "bots/data/candles",
+                 datasets_manager: Optional[CandlesDatasetManager] = None,
+                 results_cache: Optional[BacktestingResultsCache] = None, max_finished_jobs: int = 100,
+                 job_timeout: float = 0, job_max_rss_bytes: int = 0, max_candles: int = 0,
+                 supervise_interval: float = 0.5, kill_grace_period: float = 10, max_job_resubmissions: int = 1):
+        self.max_workers = max_workers
+        self.candles_store_path = candles_store_path
+        self.datasets_manager = datasets_manager
+        self.results_cache = results_cache
+        self.max_finished_jobs = max_finished_jobs
+        self.job_timeout = job_timeout
+        self.job_max_rss_bytes = job_max_rss_bytes
+        self.max_candles = max_candles
+        self.supervise_interval = supervise_interval
+        self.kill_grace_period = kill_grace_period
+        self.max_job_resubmissions = max_job_resubmissions
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_broken = False
+        self._executor_lock = threading.Lock()
+        self._shutting_down = False
+        self._manager = None
+        self._running_jobs = None
+        self._interrupted_jobs = None
+        self._supervisor: Optional[threading.Thread] = None
+        self._supervisor_stop = threading.Event()
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is not None and self._executor_broken:
+            # A worker was killed, so the pool can't run jobs anymore.
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._executor is None:
+            self._executor_broken = False
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_initialize_worker,
+                initargs=(self.candles_store_path,
+                          self.datasets_manager.base_path if self.datasets_manager else None,
+                          self.datasets_manager.max_size_bytes if self.datasets_manager else 0,
+                          self.results_cache.base_path if self.results_cache else None,
+                          self.results_cache.max_size_bytes if self.results_cache else 0),
+            )
+        return self._executor
+
+    def _get_manager(self):
+        if self._manager is None:
+            self._manager = multiprocessing.get_context("spawn").Manager()
+            self._running_jobs = self._manager.dict()
+            self._interrupted_jobs = self._manager.dict()
+        return self._manager
+
+    def _start_supervisor(self):
+        if self._supervisor is None or not self._supervisor.is_alive():
+            self._supervisor_stop.clear()
+            self._supervisor = threading.Thread(target=self._supervise_jobs, daemon=True)
+            self._supervisor.start()
+
+    def _get_interruption_reason(self, job: Dict, started_at: float, pid: int) -> Optional[str]:
+        if job["cancel_requested"]:
+            return f"Backtesting job {job['job_id']} was cancelled"
+        if self.job_timeout and time.time() - started_at > self.job_timeout:
+            return f"Backtesting job {job['job_id']} exceeded the wall time limit of {self.job_timeout}s"
+        if self.job_max_rss_bytes and (get_process_private_rss_bytes(pid) or 0) > self.job_max_rss_bytes:
+            return (f"Backtesting job {job['job_id']} exceeded the memory limit of "
+                    f"{self.job_max_rss_bytes // 1024 ** 2} MB")
+        return None
+
+    def _supervise_jobs(self):
+        """
+        Interrupts the running jobs over a limit or cancelled with SIGUSR1, which raises in the worker if it is still
+        running the job, and kills the worker with SIGKILL if the job doesn't stop within the grace period.
+        """
+        while not self._supervisor_stop.wait(self.supervise_interval):
+            try:
+                running_jobs = dict(self._running_jobs)
+            except (OSError, EOFError, TypeError):
+                continue  # the manager is shutting down
+            for job_id, worker in running_jobs.items():
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                try:
+                    if job["interruption"] is None:
+                        reason = self._get_interruption_reason(job, worker["started_at"], worker["pid"])
+                        if reason is not None:
+                            job["interruption"] = reason
+                            job["interrupted_at"] = time.time()
+                            self._interrupted_jobs[job_id] = True
+                            os.kill(worker["pid"], signal.SIGUSR1)
+                    elif time.time() - job["interrupted_at"] > self.kill_grace_period and job_id in self._running_jobs:
+                        os.kill(worker["pid"], signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                except (OSError, EOFError, TypeError):
+                    break  # the manager is shutting down
+
+    def check_candles_limit(self, candles_count: int):
+        if self.max_candles and candles_count > self.max_candles:
+            raise ValueError(f"The backtest has {candles_count} candles, over the limit of {self.max_candles}. "
+                             f"Use a shorter time range or a lower backtesting resolution.")
+
+    def submit(self, backtesting_config: Dict[str, Any], summary_only: bool = False, events_queue=None,
+               executors_batch_size: int = 100, internal: bool = False) -> str:
+        """
+        Submits a backtest and returns its job id.
+        :raises ValueError: If the backtest is over the candles limit.
+        """
+        self.check_candles_limit(get_candles_count(backtesting_config))
+        return self._submit(run_backtesting_job, backtesting_config, summary_only, events_queue, executors_batch_size,
+                            internal=internal)
+
+    def submit_portfolio(self, portfolio_config: Dict[str, Any]) -> str:
+        self.check_candles_limit(get_candles_count(portfolio_config) * len(portfolio_config["configs"]))
+        return self._submit(run_portfolio_backtesting_job, portfolio_config)
+
+    def _submit(self, job_function, backtesting_config: Dict[str, Any], *args, internal: bool = False) -> str:
+        self._clean_finished_jobs()
+        self._get_manager()
+        self._start_supervisor()
+        job_id = str(uuid.uuid4())
+        self._jobs[job_id] = {
+            "job_id": job_id,
+            "config": backtesting_config,
+            "submitted_at": time.time(),
+            "finished_at": None,
+            "future": Future(),
+            "job_args": (_run_job, job_id, self._running_jobs, self._interrupted_jobs, job_function, backtesting_config,
+                         *args),
+            "attempt": None,
+            "attempt_executor": None,
+            "resubmissions": 0,
+            "cancel_requested": False,
+            "interruption": None,
+            "interrupted_at": None,
+            "internal": internal,
+        }
+        self._start_attempt(job_id)
+        return job_id
+
+    def _start_attempt(self, job_id: str):
+        """
+        Submits the job to the pool, rebuilding it first if it is broken.
+        """
+        job = self._jobs[job_id]
+        with self._executor_lock:
+            executor = self._get_executor()
+            try:
+                attempt = executor.submit(*job["job_args"])
+            except BrokenProcessPool:
+                self._executor_broken = True
+                executor = self._get_executor()
+                attempt = executor.submit(*job["job_args"])
+            job["attempt"], job["attempt_executor"] = attempt, executor
+        attempt.add_done_callback(lambda f: self._on_attempt_done(job_id, f))
+
+    async def run(self, backtesting_config: Dict[str, Any], summary_only: bool = False, internal: bool = False) -> Dict:
+        """
+        Submits a job and waits for its result.
+        """
+        job_id = self.submit(backtesting_config, summary_only, internal=internal)
+        return await self._collect_job(job_id)
+
+    async def run_portfolio(self, portfolio_config: Dict[str, Any]) -> Dict:
+        """
+        Submits a portfolio backtest job and waits for its result.
+        """
+        job_id = self.submit_portfolio(portfolio_config)
+        return await self._wait_job(job_id)
+
+    async def prefetch_candles(self, backtesting_config: Dict[str, Any]):
+        """
+        Downloads the candles of a backtest into the candles store on the pool, so the jobs that split its range read
+        them from disk. The max candles limit doesn't apply since nothing is backtested.
+        """
+        await self.run_function(prefetch_candles_job, backtesting_config)
+
+    async def run_function(self, job_function: Callable[[Dict[str, Any]], Any], job_config: Dict[str, Any]) -> Any:
+        """
+        Runs a module level function with the job config on the pool, for analyses that don't need a backtest. The job
+        is internal, so it doesn't show in the jobs list nor evict the finished backtests.
+        """
+        job_id = self._submit(job_function, job_config, internal=True)
+        return await self._collect_job(job_id)
+
+    async def _collect_job(self, job_id: str) -> Any:
+        try:
+            return await self._wait_job(job_id)
+        finally:
+            if self._jobs[job_id]["internal"]:
+                self._jobs.pop(job_id, None)
+
+    async def _wait_job(self, job_id: str) -> Any:
+        try:
+            return await asyncio.wrap_future(self._jobs[job_id]["future"])
+        except (BacktestingJobInterrupted, BrokenProcessPool):
+            raise RuntimeError(self._get_job_error(job_id))
+
+    async def stream(self, backtesting_config: Dict[str, Any], executors_batch_size: int = 100,
+                     poll_interval: float = 0.5) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Submits a job and yields its events as they happen: ("job", {"job_id"}), ("progress", {...}) and
+        ("executors", [...]) while it runs, then ("results", {...}) or ("error", {"error"}). The job only returns the
+        summary, since the executors were already streamed.
+        """
+        events_queue = self._get_manager().Queue()
+        job_id = self.submit(backtesting_config, summary_only=True, events_queue=events_queue,
+                             executors_batch_size=executors_batch_size)
+        future = self._jobs[job_id]["future"]
+        yield "job", {"job_id": job_id}
+        try:
+            while True:
+                try:
+                    yield await asyncio.to_thread(events_queue.get, True, poll_interval)
+                except queue.Empty:
+                    if future.done() and events_queue.empty():
+                        break
+            if future.cancelled():
+                yield "error", {"error": f"Backtesting job {job_id} was cancelled"}
+            elif future.exception() is not None:
+                yield "error", {"error": self._get_job_error(job_id)}
+            else:
+                yield "results", future.result()["results"]
+        finally:
+            # Stops the job when the client goes away before it finishes.
+            self.cancel_job(job_id)
+
+    def _on_attempt_done(self, job_id: str, attempt: Future):
+        """
+        Resolves the job future with the attempt, or resubmits the job when its worker was lost because of another job.
+        Called from the pool management thread (or from cancel_job).
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        exception = None if attempt.cancelled() else attempt.exception()
+        if isinstance(exception, BrokenProcessPool):
+            with self._executor_lock:
+                if job["attempt_executor"] is self._executor:
+                    self._executor_broken = True
+            try:
+                # The worker was killed, so it couldn't unregister the job.
+                self._running_jobs.pop(job_id, None)
+            except (OSError, EOFError, TypeError):
+                pass
+            if (job["interruption"] is None and not job["cancel_requested"] and not self._shutting_down and
+                    job["resubmissions"] < self.max_job_resubmissions):
+                job["resubmissions"] += 1
+                self._start_attempt(job_id)
+                return
+        if job["interruption"] is not None:
+            try:
+                self._interrupted_jobs.pop(job_id, None)
+            except (OSError, EOFError, TypeError, AttributeError):
+                pass
+        job["finished_at"] = time.time()
+        if attempt.cancelled():
+            job["future"].cancel()
+        elif exception is not None:
+            job["future"].set_exception(exception)
+        else:
+            job["future"].set_result(attempt.result())
+
+    def _clean_finished_jobs(self):
+        finished_ids = [job_id for job_id, job in list(self._jobs.items())
+                        if job["future"].done() and not job["internal"]]
+        for finished_id in finished_ids[:max(len(finished_ids) - self.max_finished_jobs, 0)]:
+            self._jobs.pop(finished_id, None)
+
+    def _get_job(self, job_id: str) -> Dict:
+        if job_id not in self._jobs:
+            raise KeyError(f"Backtesting job {job_id} not found")
+        return self._jobs[job_id]
+
+    @staticmethod
+    def _get_future_status(future: Future) -> str:
+        if future.cancelled():
+            return "cancelled"
+        if future.done():
+            return "failed" if future.exception() is not None else "completed"
+        return "running" if future.running() else "pending"
+
+    def get_job_status(self, job_id: str) -> Dict:
+        job = self._get_job(job_id)
+        future = job["future"]
+        status = {
+            "job_id": job_id,
+            "status": self._get_future_status(future if future.done() else job["attempt"]),
+            "submitted_at": job["submitted_at"],
+            "finished_at": job["finished_at"],
+        }
+        if status["status"] == "failed":
+            status["error"] = self._get_job_error(job_id)
+        elif status["status"] == "running" and job["cancel_requested"]:
+            status["status"] = "cancelling"
+        return status
+
+    def _get_job_error(self, job_id: str) -> str:
+        job = self._get_job(job_id)
+        if job["interruption"] is not None:
+            return job["interruption"]
+        exception = job["future"].exception()
+        if isinstance(exception, BrokenProcessPool):
+            return f"The worker of backtesting job {job_id} was terminated abruptly"
+        return str(exception)
+
+    def get_jobs_status(self) -> List[Dict]:
+        return [self.get_job_status(job_id) for job_id, job in list(self._jobs.items()) if not job["internal"]]
+
+    def get_job_result(self, job_id: str) -> Dict:
+        """
+        Returns the result of a finished job.
+        :raises KeyError: If the job doesn't exist.
+        :raises RuntimeError: If the job is not completed.
+        """
+        job = self._get_job(job_id)
+        status = self._get_future_status(job["future"])
+        if status != "completed":
+            raise RuntimeError(f"Backtesting job {job_id} is {status}")
+        return job["future"].result()
+
+    def cancel_job(self, job_id: str) -> bool:
+        """
+        Cancels a pending job, or asks the worker to interrupt it when it is running. Returns False if it already
+        finished.
+        """
+        job = self._get_job(job_id)
+        if job["future"].done():
+            return False
+        if job["attempt"].cancel():
+            return True
+        job["cancel_requested"] = True
+        return True
+
+    def shutdown(self):
+        self._shutting_down = True
+        self._supervisor_stop.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+            self._running_jobs = None
+            self._interrupted_jobs = None
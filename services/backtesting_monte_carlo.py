@@ -0,0 +1,132 @@
+import asyncio
+import math
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from services.backtesting_jobs import BacktestingJobManager
+
+MONTE_CARLO_METHODS = ("bootstrap", "permutation")
+METRICS = ("net_pnl_quote", "max_drawdown_usd", "max_drawdown_pct", "sharpe_ratio")
+PERCENTILES = (5, 25, 50, 75, 95)
+# Simulations of each job, fixed so the results of a seed don't depend on the number of workers.
+CHUNK_SIMULATIONS = 1000
+# Max values in the simulated paths matrices, to bound the memory of the workers.
+MAX_BATCH_VALUES = 2_000_000
+
+
+def get_executors_trades(executors: Union[List[Dict], Dict[str, List]]) -> Dict[str, np.ndarray]:
+    """
+    Returns the net pnl and volume of the executors with position, in their order, from the executors of a backtest
+    result or of a performance results payload.
+    """
+    executors_df = pd.DataFrame(executors)
+    if executors_df.empty:
+        return {"pnl": np.array([]), "volume": np.array([])}
+    net_pnl_quote = pd.to_numeric(executors_df["net_pnl_quote"]).to_numpy(dtype=np.float64)
+    filled_amount_quote = pd.to_numeric(executors_df["filled_amount_quote"]).to_numpy(dtype=np.float64)
+    with_position = net_pnl_quote != 0
+    return {"pnl": net_pnl_quote[with_position], "volume": filled_amount_quote[with_position]}
+
+
+def compute_paths_metrics(pnl_paths: np.ndarray, volume_paths: np.ndarray, total_amount_quote: float) -> Dict[str, np.ndarray]:
+    """
+    Computes the metrics of each row of trades the same way BacktestingEngineBase.summarize_results does.
+    """
+    cumulative_returns = np.cumsum(pnl_paths, axis=1)
+    cumulative_volume = np.cumsum(volume_paths, axis=1)
+    max_drawdown_usd = np.min(cumulative_returns - np.maximum.accumulate(cumulative_returns, axis=1), axis=1)
+    returns = np.divide(cumulative_returns, cumulative_volume, out=np.full_like(cumulative_returns, np.nan),
+                        where=cumulative_volume != 0)
+    if returns.shape[1] > 1:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sharpe_ratio = np.nanmean(returns, axis=1) / np.nanstd(returns, axis=1, ddof=1)
+    else:
+        sharpe_ratio = np.zeros(len(returns))
+    return {
+        "net_pnl_quote": cumulative_returns[:, -1],
+        "max_drawdown_usd": max_drawdown_usd,
+        "max_drawdown_pct": max_drawdown_usd / (total_amount_quote + cumulative_returns[:, 0]),
+        "sharpe_ratio": sharpe_ratio,
+    }
+
+
+def run_monte_carlo_chunk(chunk_config: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    Simulates `n_simulations` paths of trades with the generator of the chunk seed. Bootstrap resamples the trades with
+    replacement and permutation shuffles their order, so it keeps the final pnl and only changes the path.
+    """
+    pnl, volume = chunk_config["pnl"], chunk_config["volume"]
+    rng = np.random.default_rng(chunk_config["seed_sequence"])
+    n_trades = len(pnl)
+    batch_size = max(MAX_BATCH_VALUES // n_trades, 1)
+    metrics = {metric: [] for metric in METRICS}
+    remaining = chunk_config["n_simulations"]
+    while remaining > 0:
+        n_simulations = min(batch_size, remaining)
+        if chunk_config["method"] == "bootstrap":
+            indexes = rng.integers(0, n_trades, size=(n_simulations, n_trades))
+        else:
+            indexes = rng.permuted(np.broadcast_to(np.arange(n_trades), (n_simulations, n_trades)), axis=1)
+        batch_metrics = compute_paths_metrics(pnl[indexes], volume[indexes], chunk_config["total_amount_quote"])
+        for metric, values in batch_metrics.items():
+            metrics[metric].append(values)
+        remaining -= n_simulations
+    return {metric: np.concatenate(values) for metric, values in metrics.items()}
+
+
+def summarize_distribution(values: np.ndarray, actual_value: float, bins: int) -> Dict[str, Any]:
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return {}
+    # The permutations keep the final pnl, so its values only differ by the rounding of the sums, too little for
+    # np.histogram to split into bins.
+    counts, edges = np.histogram(values, bins=1 if np.isclose(np.min(values), np.max(values)) else bins)
+    return {
+        "actual": actual_value,
+        # Share of the simulations at or below the actual value.
+        "actual_percentile": float(np.mean(values <= actual_value)) if np.isfinite(actual_value) else None,
+        "mean": float(np.mean(values)),
+        "std": float(np.std(values)),
+        "min": float(np.min(values)),
+        "max": float(np.max(values)),
+        "percentiles": {str(p): float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))},
+        "histogram": {"counts": counts.tolist(), "edges": edges.tolist()},
+    }
+
+
+async def run_monte_carlo(job_manager: BacktestingJobManager, executors: Union[List[Dict], Dict[str, List]],
+                          method: str = "bootstrap", n_simulations: int = 10000, seed: Optional[int] = None,
+                          total_amount_quote: float = 1000, bins: int = 50) -> Dict[str, Any]:
+    """
+    Runs a Monte Carlo analysis of the executors trades on the job manager process pool and returns the distributions
+    of the final pnl, max drawdown and sharpe ratio next to the actual values. Each chunk of simulations gets its own
+    stream spawned from the seed, so a seed always reproduces the same results. The seed is generated when missing and
+    returned.
+    """
+    if method not in MONTE_CARLO_METHODS:
+        raise ValueError(f"Unknown method {method}, available methods: {', '.join(MONTE_CARLO_METHODS)}")
+    trades = get_executors_trades(executors)
+    if len(trades["pnl"]) < 2:
+        raise ValueError("At least two executors with position are required")
+    seed_sequence = np.random.SeedSequence(seed)
+    n_chunks = math.ceil(n_simulations / CHUNK_SIMULATIONS)
+    chunks = [{**trades, "method": method, "seed_sequence": chunk_seed_sequence, "total_amount_quote": total_amount_quote,
+               "n_simulations": min(CHUNK_SIMULATIONS, n_simulations - i * CHUNK_SIMULATIONS)}
+              for i, chunk_seed_sequence in enumerate(seed_sequence.spawn(n_chunks))]
+    chunks_metrics = await asyncio.gather(*[job_manager.run_function(run_monte_carlo_chunk, chunk) for chunk in chunks])
+    actual_metrics = compute_paths_metrics(trades["pnl"][np.newaxis], trades["volume"][np.newaxis], total_amount_quote)
+    distributions = {}
+    for metric in METRICS:
+        values = np.concatenate([chunk_metrics[metric] for chunk_metrics in chunks_metrics])
+        distributions[metric] = summarize_distribution(values, float(actual_metrics[metric][0]), bins)
+    net_pnl_quote = np.concatenate([chunk_metrics["net_pnl_quote"] for chunk_metrics in chunks_metrics])
+    return {
+        "method": method,
+        "n_simulations": n_simulations,
+        "n_trades": len(trades["pnl"]),
+        "seed": seed_sequence.entropy,
+        "probability_of_loss": float(np.mean(net_pnl_quote < 0)),
+        "distributions": distributions,
+    }
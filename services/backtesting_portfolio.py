@@ -0,0 +1,219 @@
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from hummingbot.strategy_v2.backtesting.backtesting_engine_base import BacktestingEngineBase
+from hummingbot.strategy_v2.models.executors import CloseType
+from hummingbot.strategy_v2.models.executors_info import ExecutorInfo
+
+from services.backtesting_service import load_controller_config
+
+
+def get_position_fill(executor_info: ExecutorInfo, timestamps: np.ndarray,
+                      timeline_prices: np.ndarray) -> Optional[Tuple[int, float, float]]:
+    """
+    Returns the index where the position executor filled, its entry price and filled amount in quote, or None when it
+    never filled. Like the position executor simulator, limit entries fill at the first close that crosses the entry
+    price and market entries at the executor creation, both at that close.
+    """
+    if float(executor_info.filled_amount_quote) == 0 or len(timestamps) == 0:
+        return None
+    config = executor_info.config
+    open_index = min(int(np.searchsorted(timestamps, executor_info.timestamp, side="left")), len(timestamps) - 1)
+    fill_index = open_index
+    if config.triple_barrier_config.open_order_type.is_limit_type():
+        entry_price = float(config.entry_price)
+        prices = timeline_prices[open_index:]
+        crossed = np.flatnonzero(prices <= entry_price if config.side.name == "BUY" else prices >= entry_price)
+        if len(crossed):
+            fill_index += int(crossed[0])
+    entry_price = float(timeline_prices[fill_index])
+    return fill_index, entry_price, float(config.amount) * entry_price
+
+
+def get_equity_curve(executors_info: List[ExecutorInfo], timestamps: np.ndarray, price_timestamps: np.ndarray,
+                     prices: np.ndarray, trade_cost: float) -> np.ndarray:
+    """
+    Returns the pnl in quote of the executors at each timestamp. Closed executors add their net pnl from their close
+    and the open position executors are marked to market with the price, the same way the position executor simulator
+    computes their pnl from their fill (position executors that never filled don't count). Other executor types only
+    count once they close.
+    """
+    equity = np.zeros(len(timestamps))
+    if len(price_timestamps) == 0:
+        return equity
+    # Price of each timestamp, carrying the last known price forward.
+    price_indexes = np.clip(np.searchsorted(price_timestamps, timestamps, side="right") - 1, 0, None)
+    timeline_prices = prices[price_indexes]
+    realized = np.zeros(len(timestamps))
+    for executor_info in executors_info:
+        close_timestamp = executor_info.close_timestamp if executor_info.close_timestamp is not None else np.inf
+        close_index = int(np.searchsorted(timestamps, close_timestamp, side="left"))
+        if close_index < len(timestamps):
+            realized[close_index] += float(executor_info.net_pnl_quote)
+        if executor_info.type != "position_executor":
+            if executor_info.close_timestamp is None:
+                realized[-1] += float(executor_info.net_pnl_quote)
+            continue
+        position_fill = get_position_fill(executor_info, timestamps, timeline_prices)
+        if position_fill is None:
+            continue
+        open_index, entry_price, filled_amount_quote = position_fill
+        side_multiplier = 1 if executor_info.config.side.name == "BUY" else -1
+        equity[open_index:close_index] += ((timeline_prices[open_index:close_index] / entry_price - 1) * side_multiplier -
+                                           trade_cost) * filled_amount_quote
+    return equity + np.cumsum(realized)
+
+
+def get_max_drawdown_stop_index(equity: np.ndarray, max_drawdown: Optional[float]) -> Optional[int]:
+    """
+    Returns the first index where the drawdown from the highest pnl (starting at 0) is over max_drawdown, as checked
+    on every tick by the v2_with_controllers script.
+    """
+    if not max_drawdown or len(equity) == 0:
+        return None
+    max_pnl = np.maximum.accumulate(np.maximum(equity, 0))
+    stop_indexes = np.flatnonzero(max_pnl - equity > max_drawdown)
+    return int(stop_indexes[0]) if len(stop_indexes) else None
+
+
+def get_max_drawdown(equity: np.ndarray) -> float:
+    if len(equity) == 0:
+        return 0.0
+    return float(np.min(equity - np.maximum.accumulate(np.maximum(equity, 0))))
+
+
+def stop_executors_at(executors_info: List[ExecutorInfo], stop_timestamp: float, timestamps: np.ndarray,
+                      equity_prices: np.ndarray, trade_cost: float, close_positions: bool = True) -> List[ExecutorInfo]:
+    """
+    Applies a stop: the executors created after it are dropped and the position executors still waiting for their fill
+    are closed early at the stop without pnl. With `close_positions`, as for the global stop, the ones already trading
+    are closed early too with their marked-to-market pnl (other executor types keep their pnl). Otherwise, as for a
+    controller stop, they run until they close.
+    """
+    stop_index = int(np.searchsorted(timestamps, stop_timestamp, side="left"))
+    stopped_executors = []
+    for executor_info in executors_info:
+        if executor_info.timestamp > stop_timestamp:
+            continue
+        if executor_info.close_timestamp is not None and executor_info.close_timestamp <= stop_timestamp:
+            stopped_executors.append(executor_info)
+            continue
+        update = {"close_timestamp": float(stop_timestamp), "close_type": CloseType.EARLY_STOP}
+        if executor_info.type == "position_executor":
+            position_fill = get_position_fill(executor_info, timestamps, equity_prices)
+            is_trading = position_fill is not None and position_fill[0] <= stop_index
+            if is_trading and not close_positions:
+                stopped_executors.append(executor_info)
+                continue
+            net_pnl_pct, filled_amount_quote = 0.0, 0.0
+            if is_trading:
+                _, entry_price, filled_amount_quote = position_fill
+                side_multiplier = 1 if executor_info.config.side.name == "BUY" else -1
+                net_pnl_pct = (equity_prices[stop_index] / entry_price - 1) * side_multiplier - trade_cost
+            update.update({"net_pnl_pct": Decimal(str(net_pnl_pct)),
+                           "net_pnl_quote": Decimal(str(net_pnl_pct * filled_amount_quote)),
+                           "filled_amount_quote": Decimal(str(filled_amount_quote * 2))})
+        elif not close_positions:
+            stopped_executors.append(executor_info)
+            continue
+        stopped_executors.append(executor_info.model_copy(update=update))
+    return stopped_executors
+
+
+def downsample_curve(values: np.ndarray, bucket_starts: np.ndarray, aggregation: str) -> List[float]:
+    if len(values) == 0:
+        return []
+    if aggregation == "min":
+        return np.minimum.reduceat(values, bucket_starts).tolist()
+    bucket_ends = np.r_[bucket_starts[1:] - 1, len(values) - 1]
+    return values[bucket_ends].tolist()
+
+
+async def run_portfolio_backtesting(backtesting_engine: BacktestingEngineBase, portfolio_config: Dict[str, Any]) -> Dict:
+    """
+    Backtests several controllers over the same period with one engine, so candles shared by the controllers are
+    loaded once, and combines their executors on a common timeline. The max controller and global drawdowns follow
+    the v2_with_controllers script: a controller over its drawdown stops creating executors and stops the ones that
+    haven't filled yet, and a global drawdown stops every controller and closes the open executors. Returns the
+    per-controller and combined summaries, equity and drawdown curves downsampled to `max_points`.
+    """
+    trade_cost = portfolio_config["trade_cost"]
+    backtesting_engine.vectorized = portfolio_config.get("vectorized", False)
+    controllers = []
+    for config in portfolio_config["configs"]:
+        controller_config = load_controller_config(backtesting_engine, config)
+        backtesting_results = await backtesting_engine.run_backtesting(
+            controller_config=controller_config, trade_cost=trade_cost,
+            start=int(portfolio_config["start_time"]), end=int(portfolio_config["end_time"]),
+            backtesting_resolution=portfolio_config["backtesting_resolution"])
+        features = backtesting_results["processed_data"]["features"]
+        controllers.append({
+            "controller_id": controller_config.id,
+            "controller_name": controller_config.controller_name,
+            "total_amount_quote": float(controller_config.total_amount_quote),
+            "executors": backtesting_results["executors"],
+            "price_timestamps": features["timestamp"].to_numpy(dtype=np.float64),
+            "prices": features["close"].to_numpy(dtype=np.float64),
+        })
+    timestamps = np.unique(np.concatenate([controller["price_timestamps"] for controller in controllers]))
+
+    def update_equity(controller: Dict):
+        controller["equity"] = get_equity_curve(controller["executors"], timestamps, controller["price_timestamps"],
+                                                controller["prices"], trade_cost)
+
+    def get_equity_prices(controller: Dict) -> np.ndarray:
+        price_indexes = np.clip(np.searchsorted(controller["price_timestamps"], timestamps, side="right") - 1, 0, None)
+        return controller["prices"][price_indexes]
+
+    for controller in controllers:
+        update_equity(controller)
+        stop_index = get_max_drawdown_stop_index(controller["equity"], portfolio_config.get("max_controller_drawdown"))
+        controller["stopped_at"] = None
+        if stop_index is not None:
+            # The new executors and the ones waiting for their fill are stopped, the ones already trading run until
+            # they close.
+            controller["stopped_at"] = float(timestamps[stop_index])
+            controller["executors"] = stop_executors_at(controller["executors"], controller["stopped_at"], timestamps,
+                                                        get_equity_prices(controller), trade_cost,
+                                                        close_positions=False)
+            update_equity(controller)
+
+    global_stopped_at = None
+    global_stop_index = get_max_drawdown_stop_index(sum(c["equity"] for c in controllers),
+                                                    portfolio_config.get("max_global_drawdown"))
+    if global_stop_index is not None:
+        global_stopped_at = float(timestamps[global_stop_index])
+        for controller in controllers:
+            controller["executors"] = stop_executors_at(controller["executors"], global_stopped_at, timestamps,
+                                                        get_equity_prices(controller), trade_cost)
+            update_equity(controller)
+
+    combined_equity = sum(c["equity"] for c in controllers)
+    bucket_size = max(int(np.ceil(len(timestamps) / portfolio_config.get("max_points", 1000))), 1)
+    bucket_starts = np.arange(0, len(timestamps), bucket_size)
+    total_amount_quote = sum(c["total_amount_quote"] for c in controllers)
+    all_executors = [e for controller in controllers for e in controller["executors"]]
+    combined_results = BacktestingEngineBase.summarize_results(all_executors, total_amount_quote)
+    combined_results["max_drawdown_usd"] = get_max_drawdown(combined_equity)
+    combined_results["max_drawdown_pct"] = combined_results["max_drawdown_usd"] / total_amount_quote
+    combined_results["stopped_at"] = global_stopped_at
+    return {
+        "timestamps": downsample_curve(timestamps, bucket_starts, "last"),
+        "controllers": [{
+            "controller_id": controller["controller_id"],
+            "controller_name": controller["controller_name"],
+            "results": {**BacktestingEngineBase.summarize_results(controller["executors"],
+                                                                  controller["total_amount_quote"]),
+                        "max_drawdown_usd": get_max_drawdown(controller["equity"]),
+                        "stopped_at": controller["stopped_at"]},
+            "equity": downsample_curve(controller["equity"], bucket_starts, "last"),
+            "executors": [e.to_dict() for e in controller["executors"]],
+        } for controller in controllers],
+        "combined": {
+            "results": combined_results,
+            "equity": downsample_curve(combined_equity, bucket_starts, "last"),
+            "drawdown": downsample_curve(combined_equity - np.maximum.accumulate(np.maximum(combined_equity, 0)),
+                                         bucket_starts, "min"),
+        },
+    }
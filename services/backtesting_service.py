@@ -0,0 +1,127 @@
+import math
+from typing import Any, Dict, List, Optional, Union
+
+import pandas as pd
+from hummingbot.strategy_v2.backtesting.backtesting_engine_base import BacktestingEngineBase
+
+from config import CONTROLLERS_MODULE, CONTROLLERS_PATH
+from services.backtesting_cache import BacktestingResultsCache
+from services.candles_store import CANDLES_AGGREGATIONS, INTERVALS_IN_SECONDS, resample_candles
+
+# The processed data has the candles of the backtesting resolution with the "_bt" suffix besides the plain columns.
+PROCESSED_DATA_AGGREGATIONS = {**CANDLES_AGGREGATIONS, **{f"{column}_bt": aggregation
+                                                          for column, aggregation in CANDLES_AGGREGATIONS.items()}}
+
+
+def load_controller_config(backtesting_engine: BacktestingEngineBase, config: Union[Dict, str]):
+    """
+    Loads the controller config from a yml file name in the controllers config folder or from a dict.
+    """
+    if isinstance(config, str):
+        return backtesting_engine.get_controller_config_instance_from_yml(
+            config_path=config,
+            controllers_conf_dir_path=CONTROLLERS_PATH,
+            controllers_module=CONTROLLERS_MODULE
+        )
+    return backtesting_engine.get_controller_config_instance_from_dict(
+        config_data=config,
+        controllers_module=CONTROLLERS_MODULE
+    )
+
+
+def select_processed_data(processed_data: pd.DataFrame, columns: Optional[List[str]] = None,
+                          interval: Optional[str] = None, max_points: Optional[int] = None) -> pd.DataFrame:
+    """
+    Returns the processed data with only the selected columns (the timestamp is always kept), downsampled to a coarser
+    interval or to at most `max_points` rows. The candles columns are aggregated as OHLCV and the indicators keep the
+    last value of each bucket.
+    """
+    if columns is not None:
+        missing_columns = [column for column in columns if column not in processed_data.columns]
+        if missing_columns:
+            raise ValueError(f"Columns {missing_columns} are not in the processed data")
+        processed_data = processed_data[["timestamp"] + [column for column in columns if column != "timestamp"]]
+    if processed_data.empty or (interval is None and max_points is None):
+        return processed_data
+    bucket_in_seconds = 0
+    if interval is not None:
+        if interval not in INTERVALS_IN_SECONDS:
+            raise ValueError(f"Interval {interval} is not supported, use one of {list(INTERVALS_IN_SECONDS)}")
+        bucket_in_seconds = INTERVALS_IN_SECONDS[interval]
+    if max_points is not None and max_points < 2:
+        raise ValueError("The processed data needs at least 2 points")
+    if max_points is not None and len(processed_data) > max_points:
+        timestamps = processed_data["timestamp"]
+        span = timestamps.iloc[-1] - timestamps.iloc[0]
+        # The buckets are aligned to the epoch, so the range touches up to ceil(span / bucket) + 1 of them: a bucket
+        # larger than span / (max_points - 1) keeps them within max_points.
+        bucket_in_seconds = max(bucket_in_seconds, math.floor(span / (max_points - 1)) + 1)
+    if bucket_in_seconds == 0:
+        return processed_data
+    return resample_candles(processed_data.reset_index(drop=True), bucket_in_seconds,
+                            aggregations=PROCESSED_DATA_AGGREGATIONS)
+
+
+async def run_backtesting(backtesting_engine: BacktestingEngineBase, backtesting_config: Dict[str, Any],
+                          results_cache: Optional[BacktestingResultsCache] = None) -> Dict:
+    """
+    Runs a backtest described by the fields of the BacktestingConfig model and returns the executors as dicts, the
+    processed data features and the results summary. When a results cache is given, identical backtests are served
+    from it unless `force_recompute` is set. With `vectorized` the supported directional controllers run on the fast
+    path of the engine. The processed data is projected and downsampled as requested, while the cache keeps it whole.
+    """
+    backtesting_results = await run_backtesting_with_cache(backtesting_engine, backtesting_config, results_cache)
+    if not backtesting_config.get("include_processed_data", True):
+        processed_data = pd.DataFrame()
+    else:
+        processed_data = select_processed_data(backtesting_results["processed_data"],
+                                               columns=backtesting_config.get("processed_data_columns"),
+                                               interval=backtesting_config.get("processed_data_interval"),
+                                               max_points=backtesting_config.get("processed_data_max_points"))
+    return {**backtesting_results, "processed_data": processed_data}
+
+
+def with_controller_id(backtesting_results: Dict, controller_id: str) -> Dict:
+    """
+    The cache key leaves out the controller id, so cached executors are reassigned to the controller that asked for
+    them.
+    """
+    executors_info = []
+    for executor_info in backtesting_results["executors"]:
+        executor_info = {**executor_info, "config": {**executor_info["config"], "controller_id": controller_id}}
+        if executor_info.get("controller_id") is not None:
+            executor_info["controller_id"] = controller_id
+        executors_info.append(executor_info)
+    return {**backtesting_results, "executors": executors_info}
+
+
+async def run_backtesting_with_cache(backtesting_engine: BacktestingEngineBase, backtesting_config: Dict[str, Any],
+                                     results_cache: Optional[BacktestingResultsCache] = None) -> Dict:
+    controller_config = load_controller_config(backtesting_engine, backtesting_config["config"])
+    vectorized = backtesting_config.get("vectorized", False)
+    cache_key = None
+    if results_cache is not None:
+        cache_key = results_cache.get_key(controller_config, backtesting_config["start_time"],
+                                          backtesting_config["end_time"], backtesting_config["backtesting_resolution"],
+                                          backtesting_config["trade_cost"], vectorized=vectorized)
+        if not backtesting_config.get("force_recompute", False):
+            cached_results = results_cache.get(cache_key)
+            if cached_results is not None:
+                return with_controller_id(cached_results, controller_config.id)
+    backtesting_engine.vectorized = vectorized
+    backtesting_results = await backtesting_engine.run_backtesting(
+        controller_config=controller_config, trade_cost=backtesting_config["trade_cost"],
+        start=int(backtesting_config["start_time"]), end=int(backtesting_config["end_time"]),
+        backtesting_resolution=backtesting_config["backtesting_resolution"])
+    processed_data = backtesting_results["processed_data"]["features"].fillna(0)
+    executors_info = [e.to_dict() for e in backtesting_results["executors"]]
+    results = backtesting_results["results"]
+    results["sharpe_ratio"] = results["sharpe_ratio"] if results["sharpe_ratio"] is not None else 0
+    backtesting_results = {
+        "executors": executors_info,
+        "processed_data": processed_data,
+        "results": results,
+    }
+    if results_cache is not None:
+        results_cache.set(cache_key, backtesting_results)
+    return backtesting_results
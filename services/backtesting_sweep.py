@@ -0,0 +1,137 @@
+import asyncio
+import itertools
+import math
+import os
+import random
+import sys
+from copy import deepcopy
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import yaml
+
+from config import CONTROLLERS_PATH
+from services.backtesting_jobs import BacktestingJobManager
+
+ParameterValues = Union[List[Any], Dict[str, Union[int, float]]]
+
+
+def get_parameter_count(values: ParameterValues) -> int:
+    """
+    Returns the number of values of a parameter, given either as a list or as a range {"start", "stop", "step"} where
+    the stop is included when it falls on a step. Ranges are counted without building their values.
+    """
+    if isinstance(values, dict):
+        start, stop, step = values["start"], values["stop"], values.get("step", 1)
+        if step <= 0:
+            raise ValueError(f"The step of the range {values} must be positive")
+        if stop < start:
+            raise ValueError(f"The stop of the range {values} must not be lower than its start")
+        return int(np.floor((stop - start) / step + 1e-9)) + 1
+    return len(values)
+
+
+def get_parameter_value(values: ParameterValues, index: int) -> Any:
+    if isinstance(values, dict):
+        start, stop, step = values["start"], values["stop"], values.get("step", 1)
+        value = start + index * step
+        return value if all(isinstance(v, int) for v in (start, stop, step)) else round(value, 10)
+    return values[index]
+
+
+def get_parameter_values(values: ParameterValues) -> List[Any]:
+    return [get_parameter_value(values, index) for index in range(get_parameter_count(values))]
+
+
+def expand_parameters(parameters: Dict[str, ParameterValues], search: str = "grid", n_samples: Optional[int] = None,
+                      seed: Optional[int] = None, max_combinations: int = 1000) -> List[Dict[str, Any]]:
+    """
+    Expands the parameter space into the list of combinations to backtest, either the full cartesian product or
+    `n_samples` random combinations. The size of the space is checked before any value is built, and random
+    combinations are decoded from their index, so large ranges are never materialized.
+    """
+    names = list(parameters)
+    counts = [get_parameter_count(parameters[name]) for name in names]
+    for name, count in zip(names, counts):
+        if count == 0:
+            raise ValueError(f"The parameter {name} has no values")
+    total_combinations = math.prod(counts) if counts else 0
+    if search == "grid":
+        if total_combinations > max_combinations:
+            raise ValueError(f"The grid has {total_combinations} combinations, the maximum is {max_combinations}")
+        values = [get_parameter_values(parameters[name]) for name in names]
+        return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+    if search == "random":
+        n_samples = min(n_samples or max_combinations, total_combinations, max_combinations)
+        rng = random.Random(seed)
+        if total_combinations <= sys.maxsize:
+            sampled_indexes = rng.sample(range(total_combinations), n_samples)
+        else:
+            # random.sample needs the length of the population, which can't exceed sys.maxsize.
+            sampled_indexes = []
+            while len(sampled_indexes) < n_samples:
+                index = rng.randrange(total_combinations)
+                if index not in sampled_indexes:
+                    sampled_indexes.append(index)
+        combinations = []
+        for index in sampled_indexes:
+            combination = {}
+            for name, count in zip(reversed(names), reversed(counts)):
+                index, value_index = divmod(index, count)
+                combination[name] = get_parameter_value(parameters[name], value_index)
+            combinations.append({name: combination[name] for name in names})
+        return combinations
+    raise ValueError(f"Search {search} is not supported, use grid or random")
+
+
+def load_base_config(config: Union[Dict, str]) -> Dict:
+    if isinstance(config, str):
+        with open(os.path.join(CONTROLLERS_PATH, config), "r") as f:
+            return yaml.safe_load(f)
+    return deepcopy(config)
+
+
+def apply_parameters(base_config: Dict, parameters: Dict[str, Any]) -> Dict:
+    """
+    Returns a copy of the controller config with the parameters set. Nested fields use dotted names, e.g.
+    "triple_barrier_config.take_profit".
+    """
+    config = deepcopy(base_config)
+    for name, value in parameters.items():
+        *parents, field = name.split(".")
+        target = config
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[field] = value
+    return config
+
+
+async def run_parameter_sweep(job_manager: BacktestingJobManager, backtesting_config: Dict[str, Any],
+                              combinations: List[Dict[str, Any]], sort_by: str = "net_pnl_quote",
+                              ascending: bool = False) -> List[Dict]:
+    """
+    Backtests every combination on the job manager process pool and returns the ranked results. The first combination
+    runs alone so it downloads the candles into the local store; the rest then run in parallel reading them from disk.
+    """
+    base_config = load_base_config(backtesting_config["config"])
+
+    async def run_combination(parameters: Dict[str, Any]) -> Dict:
+        combination_config = {**backtesting_config, "config": apply_parameters(base_config, parameters)}
+        try:
+            backtesting_results = await job_manager.run(combination_config, summary_only=True, internal=True)
+            return {"parameters": parameters, **backtesting_results["results"]}
+        except Exception as e:
+            return {"parameters": parameters, "error": str(e)}
+
+    if not combinations:
+        return []
+    rows = [await run_combination(combinations[0])]
+    rows += await asyncio.gather(*[run_combination(parameters) for parameters in combinations[1:]])
+    succeeded = [row for row in rows if "error" not in row]
+    failed = [row for row in rows if "error" in row]
+    missing_value = np.inf if ascending else -np.inf
+    succeeded.sort(key=lambda row: row.get(sort_by) if row.get(sort_by) is not None else missing_value,
+                   reverse=not ascending)
+    for rank, row in enumerate(succeeded, start=1):
+        row["rank"] = rank
+    return succeeded + failed
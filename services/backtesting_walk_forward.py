@@ -0,0 +1,97 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from services.backtesting_jobs import BacktestingJobManager
+from services.backtesting_sweep import apply_parameters, load_base_config, run_parameter_sweep
+
+# Summary fields that add up across the test windows.
+ADDITIVE_RESULTS = ["net_pnl", "net_pnl_quote", "total_executors", "total_executors_with_position", "total_volume",
+                    "total_long", "total_short", "total_positions", "win_signals", "loss_signals"]
+
+
+def get_walk_forward_windows(start_time: int, end_time: int, train_duration: int, test_duration: int,
+                             step: Optional[int] = None, anchored: bool = False) -> List[Dict[str, int]]:
+    """
+    Splits [start_time, end_time] into consecutive train and test windows. Each window moves forward by `step` seconds
+    (the test duration by default, so the test windows don't overlap). Anchored windows keep training from start_time.
+    """
+    if train_duration <= 0 or test_duration <= 0:
+        raise ValueError("The train and test durations must be positive")
+    if step is not None and step <= 0:
+        raise ValueError("The step must be positive")
+    step = step or test_duration
+    windows = []
+    train_start = start_time
+    while train_start + train_duration + test_duration <= end_time:
+        train_end = train_start + train_duration
+        windows.append({
+            "train_start": start_time if anchored else train_start,
+            "train_end": train_end,
+            "test_start": train_end,
+            "test_end": train_end + test_duration,
+        })
+        train_start += step
+    if not windows:
+        raise ValueError("The time range is shorter than one train and test window")
+    return windows
+
+
+def aggregate_out_of_sample_results(windows_results: List[Dict]) -> Dict[str, Any]:
+    """
+    Combines the test windows summaries. The accuracy is recomputed from the positions and the drawdown is the worst of
+    the windows, since the summaries don't keep the executors to rebuild the combined equity curve.
+    """
+    test_results = [w["test_results"] for w in windows_results if "test_results" in w]
+    if not test_results:
+        return {}
+    aggregated = {field: sum(r[field] for r in test_results) for field in ADDITIVE_RESULTS}
+    aggregated["accuracy"] = aggregated["win_signals"] / aggregated["total_positions"] if aggregated["total_positions"] else 0
+    aggregated["max_drawdown_usd"] = min(r["max_drawdown_usd"] for r in test_results)
+    aggregated["max_drawdown_pct"] = min(r["max_drawdown_pct"] for r in test_results)
+    aggregated["profitable_windows"] = sum(1 for r in test_results if r["net_pnl_quote"] > 0)
+    aggregated["tested_windows"] = len(test_results)
+    # Walk-forward efficiency: how much of the in-sample performance of the chosen configs holds out of sample. Each
+    # side is a pnl per second, so train windows longer than the test windows don't lower it.
+    tested_windows = [w for w in windows_results if "test_results" in w]
+    train_pnl_rate = (sum(w["train_results"]["net_pnl"] for w in tested_windows) /
+                      sum(w["train_end"] - w["train_start"] for w in tested_windows))
+    test_pnl_rate = aggregated["net_pnl"] / sum(w["test_end"] - w["test_start"] for w in tested_windows)
+    aggregated["walk_forward_efficiency"] = test_pnl_rate / train_pnl_rate if train_pnl_rate > 0 else None
+    return aggregated
+
+
+async def run_walk_forward(job_manager: BacktestingJobManager, backtesting_config: Dict[str, Any],
+                           combinations: List[Dict[str, Any]], windows: List[Dict[str, int]],
+                           sort_by: str = "net_pnl_quote", ascending: bool = False) -> Dict[str, Any]:
+    """
+    Runs a parameter sweep on every train window and backtests the best combination on the following test window.
+    The candles of the whole range are first downloaded into the local store, then all the windows run in parallel on
+    the job manager process pool reading them from disk.
+    """
+    base_config = load_base_config(backtesting_config["config"])
+    await job_manager.prefetch_candles({**backtesting_config, "start_time": windows[0]["train_start"],
+                                        "end_time": windows[-1]["test_end"]})
+
+    async def run_window(window: Dict[str, int]) -> Dict:
+        train_config = {**backtesting_config, "start_time": window["train_start"], "end_time": window["train_end"]}
+        ranking = await run_parameter_sweep(job_manager, train_config, combinations, sort_by=sort_by,
+                                            ascending=ascending)
+        best = next((row for row in ranking if "error" not in row), None)
+        if best is None:
+            return {**window, "error": "Every combination failed on the train window"}
+        window_results = {**window, "parameters": best["parameters"],
+                          "train_results": {k: v for k, v in best.items() if k not in ("parameters", "rank")}}
+        test_config = {**backtesting_config, "config": apply_parameters(base_config, best["parameters"]),
+                       "start_time": window["test_start"], "end_time": window["test_end"]}
+        try:
+            test_backtesting_results = await job_manager.run(test_config, summary_only=True, internal=True)
+            window_results["test_results"] = test_backtesting_results["results"]
+        except Exception as e:
+            window_results["error"] = str(e)
+        return window_results
+
+    windows_results = await asyncio.gather(*[run_window(window) for window in windows])
+    return {
+        "windows": windows_results,
+        "out_of_sample_results": aggregate_out_of_sample_results(windows_results),
+    }
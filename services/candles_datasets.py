@@ -0,0 +1,134 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from hummingbot.data_feed.candles_feed.data_types import HistoricalCandlesConfig
+
+from services.candles_store import HistoricalCandlesStore
+
+DatasetKey = Tuple[str, str, str, int, int]
+
+
+class CandlesDatasetManager:
+    """
+    Publishes the candles of a (connector, trading pair, interval, range) as a read-only NumPy file that processes
+    attach to memory-mapped. The first process that needs a range builds it once through the candles store; the rest
+    map the same file, so they share the pages of the OS cache instead of loading and parsing their own copy.
+    Datasets are removed by least recent use once they use more than `max_size_bytes`.
+    """
+
+    def __init__(self, candles_store: HistoricalCandlesStore, base_path: str = "bots/data/candles_datasets",
+                 max_size_bytes: int = 2 * 1024 * 1024 * 1024):
+        self.candles_store = candles_store
+        self.base_path = base_path
+        self.max_size_bytes = max_size_bytes
+        self._locks: Dict[DatasetKey, asyncio.Lock] = {}
+
+    @staticmethod
+    def get_dataset_key(config: HistoricalCandlesConfig) -> DatasetKey:
+        return (config.connector_name, config.trading_pair, config.interval, int(config.start_time),
+                int(config.end_time))
+
+    def get_dataset_path(self, key: DatasetKey) -> str:
+        connector_name, trading_pair, interval, start_time, end_time = key
+        return os.path.join(self.base_path, connector_name, trading_pair, interval, f"{start_time}_{end_time}.npy")
+
+    @staticmethod
+    def get_columns_path(dataset_path: str) -> str:
+        return dataset_path[:-len(".npy")] + ".json"
+
+    def attach(self, key: DatasetKey) -> Optional[pd.DataFrame]:
+        """
+        Returns a DataFrame over the memory-mapped dataset without copying it, or None if it was not published.
+        """
+        dataset_path = self.get_dataset_path(key)
+        try:
+            candles = np.load(dataset_path, mmap_mode="r")
+            with open(self.get_columns_path(dataset_path), "r") as f:
+                columns = json.load(f)
+            # The modification time is used as the last access time for the LRU eviction.
+            os.utime(dataset_path)
+        except FileNotFoundError:
+            return None
+        return pd.DataFrame(candles, columns=columns, copy=False)
+
+    def publish(self, key: DatasetKey, candles_df: pd.DataFrame):
+        dataset_path = self.get_dataset_path(key)
+        dataset_dir = os.path.dirname(dataset_path)
+        os.makedirs(dataset_dir, exist_ok=True)
+        columns_path = self.get_columns_path(dataset_path)
+        tmp_columns_path = os.path.join(dataset_dir, f"tmp_{os.getpid()}_{os.path.basename(columns_path)}")
+        with open(tmp_columns_path, "w") as f:
+            json.dump(list(candles_df.columns), f)
+        os.replace(tmp_columns_path, columns_path)
+        tmp_dataset_path = os.path.join(dataset_dir, f"tmp_{os.getpid()}_{os.path.basename(dataset_path)}")
+        with open(tmp_dataset_path, "wb") as f:
+            np.save(f, candles_df.to_numpy(dtype=np.float64))
+        os.replace(tmp_dataset_path, dataset_path)
+        self.evict()
+
+    async def get_candles(self, config: HistoricalCandlesConfig) -> pd.DataFrame:
+        """
+        Returns the candles of the range attached from the published dataset, building and publishing it first when
+        needed. Ranges that include the open candle are not published since that candle can still change.
+        """
+        key = self.get_dataset_key(config)
+        candles_df = self.attach(key)
+        if candles_df is not None:
+            return candles_df
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            candles_df = self.attach(key)
+            if candles_df is not None:
+                return candles_df
+            candles_df = await self.candles_store.get_historical_candles(config)
+            interval_in_seconds = self.candles_store.get_interval_in_seconds(config.interval)
+            now = time.time()
+            if interval_in_seconds is None or candles_df.empty or \
+                    config.end_time > int(now - now % interval_in_seconds) - interval_in_seconds:
+                return candles_df
+            try:
+                self.publish(key, candles_df)
+            except Exception as e:
+                logging.error(f"Error publishing candles dataset {key}: {e}")
+                return candles_df
+            return self.attach(key)
+
+    def _list_datasets(self) -> List[Tuple[float, int, str]]:
+        datasets = []
+        if not os.path.exists(self.base_path):
+            return datasets
+        for root, _, file_names in os.walk(self.base_path):
+            for file_name in file_names:
+                if not file_name.endswith(".npy") or file_name.startswith("tmp_"):
+                    continue
+                path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(path)
+                    datasets.append((stat.st_mtime, stat.st_size, path))
+                except FileNotFoundError:
+                    continue
+        return datasets
+
+    def evict(self):
+        # Processes that still map an evicted dataset keep reading it, the file is only released when unmapped.
+        datasets = self._list_datasets()
+        total_size = sum(size for _, size, _ in datasets)
+        for _, size, path in sorted(datasets):
+            if total_size <= self.max_size_bytes:
+                break
+            for file_path in (path, self.get_columns_path(path)):
+                try:
+                    os.remove(file_path)
+                except FileNotFoundError:
+                    pass
+            total_size -= size
+
+    def get_status(self) -> Dict:
+        sizes = [size for _, size, _ in self._list_datasets()]
+        return {"datasets": len(sizes), "size_bytes": sum(sizes), "max_size_bytes": self.max_size_bytes}
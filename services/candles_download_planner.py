@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+import pandas as pd
+from hummingbot.data_feed.candles_feed.data_types import HistoricalCandlesConfig
+
+from services.shared_limits import SharedTokenBucket
+
+
+class TokenBucket:
+    """
+    Token bucket that refills `rate` tokens per second up to `capacity`; `acquire` waits until enough tokens are
+    available.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    async def acquire(self, tokens: float = 1):
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+
+
+class CandlesDownloadPlanner:
+    """
+    Splits long historical candles ranges into chunks of `chunk_size` candles and downloads them in parallel, pacing
+    the requests of each connector with a token bucket. The chunks are stitched and deduplicated on timestamp, and the
+    progress of every download is kept so it can be reported while it runs. With a `rate_limits_path` the token
+    buckets are kept in files there, so every process that downloads with the same path shares them.
+    """
+
+    def __init__(self, fetch: Callable[[HistoricalCandlesConfig], Awaitable[pd.DataFrame]],
+                 requests_per_second: float = 5, burst: int = 10, chunk_size: int = 1000, max_retries: int = 3,
+                 max_finished_downloads: int = 100, rate_limits_path: Optional[str] = None):
+        self.fetch = fetch
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.max_finished_downloads = max_finished_downloads
+        self.rate_limits_path = rate_limits_path
+        self._token_buckets: Dict[str, Union[TokenBucket, SharedTokenBucket]] = {}
+        self._downloads: "OrderedDict[str, Dict]" = OrderedDict()
+
+    def get_token_bucket(self, connector_name: str) -> Union[TokenBucket, SharedTokenBucket]:
+        if connector_name not in self._token_buckets:
+            if self.rate_limits_path is not None:
+                self._token_buckets[connector_name] = SharedTokenBucket(
+                    os.path.join(self.rate_limits_path, f"{connector_name}.bucket"), rate=self.requests_per_second,
+                    capacity=self.burst)
+            else:
+                self._token_buckets[connector_name] = TokenBucket(rate=self.requests_per_second, capacity=self.burst)
+        return self._token_buckets[connector_name]
+
+    def plan_chunks(self, config: HistoricalCandlesConfig, interval_in_seconds: int) -> List[HistoricalCandlesConfig]:
+        chunk_seconds = self.chunk_size * interval_in_seconds
+        start_time = int(config.start_time - config.start_time % interval_in_seconds)
+        chunks = []
+        for chunk_start in range(start_time, int(config.end_time) + 1, chunk_seconds):
+            chunks.append(HistoricalCandlesConfig(
+                connector_name=config.connector_name,
+                trading_pair=config.trading_pair,
+                interval=config.interval,
+                start_time=chunk_start,
+                end_time=min(chunk_start + chunk_seconds - interval_in_seconds, int(config.end_time)),
+            ))
+        return chunks
+
+    async def _fetch_chunk(self, chunk: HistoricalCandlesConfig, progress: Dict) -> pd.DataFrame:
+        token_bucket = self.get_token_bucket(chunk.connector_name)
+        for attempt in range(self.max_retries + 1):
+            await token_bucket.acquire()
+            try:
+                df = await self.fetch(chunk)
+                progress["completed_chunks"] += 1
+                progress["downloaded_candles"] += len(df)
+                return df
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                logging.warning(f"Error downloading candles chunk {chunk.start_time}-{chunk.end_time} of "
+                                f"{chunk.connector_name} {chunk.trading_pair} {chunk.interval}, retrying: {e}")
+                await asyncio.sleep(2 ** attempt)
+
+    async def download(self, config: HistoricalCandlesConfig, interval_in_seconds: int) -> pd.DataFrame:
+        chunks = self.plan_chunks(config, interval_in_seconds)
+        if len(chunks) <= 1:
+            await self.get_token_bucket(config.connector_name).acquire()
+            return await self.fetch(config)
+        download_id = str(uuid.uuid4())
+        progress = {
+            "download_id": download_id,
+            "connector_name": config.connector_name,
+            "trading_pair": config.trading_pair,
+            "interval": config.interval,
+            "start_time": config.start_time,
+            "end_time": config.end_time,
+            "status": "running",
+            "total_chunks": len(chunks),
+            "completed_chunks": 0,
+            "downloaded_candles": 0,
+            "started_at": time.time(),
+        }
+        self._downloads[download_id] = progress
+        tasks = [asyncio.ensure_future(self._fetch_chunk(chunk, progress)) for chunk in chunks]
+        try:
+            chunk_dfs = await asyncio.gather(*tasks)
+            progress["status"] = "completed"
+        except Exception as e:
+            for task in tasks:
+                task.cancel()
+            progress["status"] = "failed"
+            progress["error"] = str(e)
+            raise
+        finally:
+            progress["finished_at"] = time.time()
+            self._clean_finished_downloads()
+        df = pd.concat(chunk_dfs, ignore_index=True)
+        return df.drop_duplicates(subset=["timestamp"]).sort_values("timestamp").reset_index(drop=True)
+
+    def _clean_finished_downloads(self):
+        finished_ids = [download_id for download_id, progress in self._downloads.items()
+                        if progress["status"] != "running"]
+        for download_id in finished_ids[:max(len(finished_ids) - self.max_finished_downloads, 0)]:
+            del self._downloads[download_id]
+
+    def get_downloads_progress(self) -> List[Dict]:
+        return [{**progress, "progress": progress["completed_chunks"] / progress["total_chunks"]}
+                for progress in self._downloads.values()]
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Optional, Tuple
+
+from hummingbot.data_feed.candles_feed.candles_base import CandlesBase
+from hummingbot.data_feed.candles_feed.candles_factory import CandlesFactory
+from hummingbot.data_feed.candles_feed.data_types import CandlesConfig
+
+CandlesFeedKey = Tuple[str, str, str, int]
+
+
+class ObservableCandlesDeque(deque):
+    """
+    Deque that notifies a callback every time the candles feed adds or updates a candle.
+    """
+
+    def __init__(self, iterable=(), maxlen=None, on_change=None):
+        super().__init__(iterable, maxlen)
+        self._on_change = on_change
+
+    def _notify(self):
+        if self._on_change is not None:
+            self._on_change()
+
+    def append(self, x):
+        super().append(x)
+        self._notify()
+
+    def appendleft(self, x):
+        super().appendleft(x)
+        self._notify()
+
+    def extend(self, iterable):
+        super().extend(iterable)
+        self._notify()
+
+    def extendleft(self, iterable):
+        super().extendleft(iterable)
+        self._notify()
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._notify()
+
+
+class LiveCandlesFeed:
+    """
+    Wrapper around a running candles feed that keeps track of how many requests are using it and exposes its
+    readiness as an awaitable, driven by the updates of the underlying candles deque.
+    """
+
+    def __init__(self, key: CandlesFeedKey, candles: CandlesBase):
+        self.key = key
+        self.candles = candles
+        self.ref_count = 0
+        self.last_used = time.time()
+        self._ready_event = asyncio.Event()
+        self._update_condition = asyncio.Condition()
+        self._update_version = 0
+        self._observe_candles()
+
+    def _observe_candles(self):
+        # The feed may rebuild its deque (e.g. on restart), so the observer is installed again when missing.
+        candles_deque = self.candles._candles
+        if not isinstance(candles_deque, ObservableCandlesDeque):
+            self.candles._candles = ObservableCandlesDeque(candles_deque, maxlen=candles_deque.maxlen,
+                                                           on_change=self._on_candles_update)
+
+    def _on_candles_update(self):
+        if self.candles.ready:
+            self._ready_event.set()
+        else:
+            self._ready_event.clear()
+        self._update_version += 1
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        asyncio.ensure_future(self._notify_update())
+
+    async def _notify_update(self):
+        async with self._update_condition:
+            self._update_condition.notify_all()
+
+    async def wait_for_update(self, last_version: int) -> int:
+        """
+        Waits until the candles changed after `last_version` and returns the current version.
+        """
+        async with self._update_condition:
+            await self._update_condition.wait_for(lambda: self._update_version > last_version)
+        return self._update_version
+
+    @property
+    def update_version(self) -> int:
+        return self._update_version
+
+    async def wait_until_ready(self, timeout: Optional[float] = None):
+        """
+        Waits until the feed holds a full window of candles.
+        :param timeout: Maximum number of seconds to wait, None waits forever.
+        :raises asyncio.TimeoutError: If the feed is not ready before the timeout.
+        """
+        self._observe_candles()
+        self._on_candles_update()
+        await asyncio.wait_for(self._ready_event.wait(), timeout=timeout)
+
+    @property
+    def ready(self) -> bool:
+        return self.candles.ready
+
+    @property
+    def candles_df(self):
+        return self.candles.candles_df
+
+    def start(self):
+        self.candles.start()
+
+    def stop(self):
+        self.candles.stop()
+
+
+class CandlesFeedManager:
+    """
+    This class keeps a process-wide registry of live candles feeds keyed by the candles config, so repeated requests
+    for the same connector, trading pair and interval reuse a warm feed instead of starting a new one each time.
+    Feeds are reference counted; a feed without users is kept alive for `idle_ttl` seconds and, when `max_feeds` is
+    reached, the least recently used idle feed is stopped to make room for a new one.
+    """
+
+    def __init__(self, max_feeds: int = 20, idle_ttl: int = 300, cleanup_interval: int = 30):
+        self.max_feeds = max_feeds
+        self.idle_ttl = idle_ttl
+        self.cleanup_interval = cleanup_interval
+        self._feeds: "OrderedDict[CandlesFeedKey, LiveCandlesFeed]" = OrderedDict()
+        self._cleanup_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def get_feed_key(candles_config: CandlesConfig) -> CandlesFeedKey:
+        return (candles_config.connector, candles_config.trading_pair, candles_config.interval,
+                candles_config.max_records)
+
+    def get_feeds_status(self):
+        return [{"connector": key[0], "trading_pair": key[1], "interval": key[2], "max_records": key[3],
+                 "ready": feed.ready, "ref_count": feed.ref_count,
+                 "idle_seconds": 0 if feed.ref_count > 0 else time.time() - feed.last_used}
+                for key, feed in self._feeds.items()]
+
+    def acquire(self, candles_config: CandlesConfig) -> LiveCandlesFeed:
+        """
+        Returns the live feed for the given config, starting a new one if needed. Every call must be paired with a
+        `release` of the returned feed.
+        """
+        self.stop_expired_feeds()
+        key = self.get_feed_key(candles_config)
+        feed = self._feeds.get(key)
+        if feed is None:
+            self._make_room()
+            feed = LiveCandlesFeed(key, CandlesFactory.get_candle(candles_config))
+            feed.start()
+            self._feeds[key] = feed
+        self._feeds.move_to_end(key)
+        feed.ref_count += 1
+        feed.last_used = time.time()
+        return feed
+
+    def release(self, feed: LiveCandlesFeed):
+        feed.ref_count = max(feed.ref_count - 1, 0)
+        feed.last_used = time.time()
+
+    @asynccontextmanager
+    async def feed(self, candles_config: CandlesConfig):
+        feed = self.acquire(candles_config)
+        try:
+            yield feed
+        finally:
+            self.release(feed)
+
+    def _make_room(self):
+        while len(self._feeds) >= self.max_feeds:
+            lru_idle_key = next((key for key, feed in self._feeds.items() if feed.ref_count == 0), None)
+            if lru_idle_key is None:
+                raise RuntimeError(f"All {self.max_feeds} candles feeds are in use, try again later.")
+            self._stop_feed(lru_idle_key)
+
+    def _stop_feed(self, key: CandlesFeedKey):
+        feed = self._feeds.pop(key)
+        try:
+            feed.stop()
+        except Exception as e:
+            logging.error(f"Error stopping candles feed {key}: {e}")
+
+    def stop_expired_feeds(self):
+        now = time.time()
+        expired_keys = [key for key, feed in self._feeds.items()
+                        if feed.ref_count == 0 and now - feed.last_used > self.idle_ttl]
+        for key in expired_keys:
+            self._stop_feed(key)
+
+    def stop_all_feeds(self):
+        for key in list(self._feeds):
+            self._stop_feed(key)
+
+    def start_cleanup_loop(self):
+        self._cleanup_task = asyncio.create_task(self.cleanup_loop())
+
+    def stop_cleanup_loop(self):
+        if self._cleanup_task:
+            self._cleanup_task.cancel()
+        self._cleanup_task = None
+        self.stop_all_feeds()
+
+    async def cleanup_loop(self):
+        while True:
+            self.stop_expired_feeds()
+            await asyncio.sleep(self.cleanup_interval)
@@ -0,0 +1,356 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from hummingbot.data_feed.candles_feed.candles_factory import CandlesFactory
+from hummingbot.data_feed.candles_feed.data_types import CandlesConfig, HistoricalCandlesConfig
+
+from services.candles_download_planner import CandlesDownloadPlanner
+from services.shared_limits import SharedSemaphore, file_lock
+
+INTERVALS_IN_SECONDS = {
+    "1s": 1,
+    "1m": 60,
+    "3m": 180,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "1h": 3600,
+    "2h": 7200,
+    "4h": 14400,
+    "6h": 21600,
+    "8h": 28800,
+    "12h": 43200,
+    "1d": 86400,
+    "3d": 259200,
+    "1w": 604800,
+}
+
+CANDLES_AGGREGATIONS = {
+    "open": "first",
+    "high": "max",
+    "low": "min",
+    "close": "last",
+    "volume": "sum",
+    "quote_asset_volume": "sum",
+    "n_trades": "sum",
+    "taker_buy_base_volume": "sum",
+    "taker_buy_quote_volume": "sum",
+}
+
+TimeRange = Tuple[int, int]
+
+
+def resample_candles(df: pd.DataFrame, interval_in_seconds: int,
+                     aggregations: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Aggregates candles sorted by timestamp into candles of a higher interval with NumPy reductions over the buckets,
+    using the OHLCV aggregation of each column (columns without one keep the last value).
+    """
+    aggregations = aggregations or CANDLES_AGGREGATIONS
+    if df.empty:
+        return df.copy()
+    timestamps = df["timestamp"].to_numpy(dtype=np.float64)
+    buckets = timestamps - timestamps % interval_in_seconds
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:] - 1, len(buckets) - 1]
+    resampled = {"timestamp": buckets[starts]}
+    for column in df.columns:
+        if column == "timestamp":
+            continue
+        values = df[column].to_numpy()
+        aggregation = aggregations.get(column, "last")
+        if aggregation == "first":
+            resampled[column] = values[starts]
+        elif aggregation == "max":
+            resampled[column] = np.maximum.reduceat(values, starts)
+        elif aggregation == "min":
+            resampled[column] = np.minimum.reduceat(values, starts)
+        elif aggregation == "sum":
+            resampled[column] = np.add.reduceat(values, starts)
+        else:
+            resampled[column] = values[ends]
+    return pd.DataFrame(resampled, columns=df.columns)
+
+
+class HistoricalCandlesStore:
+    """
+    On-disk store of historical candles partitioned by connector, trading pair and interval. Each partition keeps the
+    candles in NumPy segment files that are read memory-mapped, plus a metadata file with the segments and the time
+    ranges that were already downloaded. A request only fetches the ranges that are missing from the exchange, appends
+    them to the partition as a new segment and serves the rest from disk.
+
+    Every store on the same base path (the routers and the backtesting workers) shares the per-connector rate limits
+    and writes under a lock file of the partition, so concurrent writers don't drop each other's candles.
+    """
+    # Name of the candles file of the partitions written before the segments.
+    candles_file_name = "candles.npy"
+    metadata_file_name = "metadata.json"
+    lock_file_name = ".lock"
+    limits_dir_name = ".limits"
+    max_read_attempts = 3
+
+    def __init__(self, base_path: str = "bots/data/candles", max_concurrent_requests_per_connector: int = 5,
+                 base_interval: str = "1m", requests_per_second: float = 5, download_chunk_size: int = 1000,
+                 max_segments: int = 64):
+        self.base_path = base_path
+        self.base_interval = base_interval
+        self.max_concurrent_requests_per_connector = max_concurrent_requests_per_connector
+        self.max_segments = max_segments
+        self.limits_path = os.path.join(base_path, self.limits_dir_name)
+        self.download_planner = CandlesDownloadPlanner(fetch=self.fetch_candles,
+                                                       requests_per_second=requests_per_second,
+                                                       chunk_size=download_chunk_size,
+                                                       rate_limits_path=self.limits_path)
+        self._locks: Dict[Tuple[str, str, str], asyncio.Lock] = {}
+        self._connector_semaphores: Dict[str, SharedSemaphore] = {}
+
+    @staticmethod
+    def get_interval_in_seconds(interval: str) -> Optional[int]:
+        return INTERVALS_IN_SECONDS.get(interval)
+
+    def get_partition_path(self, connector_name: str, trading_pair: str, interval: str) -> str:
+        return os.path.join(self.base_path, connector_name, trading_pair, interval)
+
+    def load_metadata(self, connector_name: str, trading_pair: str, interval: str) -> Dict:
+        metadata_path = os.path.join(self.get_partition_path(connector_name, trading_pair, interval),
+                                     self.metadata_file_name)
+        if not os.path.exists(metadata_path):
+            return {"columns": [], "covered_ranges": [], "segments": []}
+        with open(metadata_path, "r") as f:
+            metadata = json.load(f)
+        if "segments" not in metadata:
+            # Partitions written before the segments keep all their candles in a single file.
+            metadata["segments"] = [{"file": metadata.pop("candles_file", self.candles_file_name),
+                                     "start": None, "end": None}]
+        return metadata
+
+    def load_segments(self, connector_name: str, trading_pair: str, interval: str, start_time: float,
+                      end_time: float) -> Tuple[Dict, List[np.ndarray]]:
+        """
+        Loads the metadata and the segments, in the order they were written, that can have candles between start_time
+        and end_time. A compaction can remove the segments right after replacing the metadata, in which case the
+        metadata is loaded again.
+        """
+        partition_path = self.get_partition_path(connector_name, trading_pair, interval)
+        for attempt in range(self.max_read_attempts):
+            metadata = self.load_metadata(connector_name, trading_pair, interval)
+            try:
+                return metadata, [np.load(os.path.join(partition_path, segment["file"]), mmap_mode="r")
+                                  for segment in metadata["segments"]
+                                  if segment["start"] is None or (segment["start"] <= end_time and
+                                                                  segment["end"] >= start_time)]
+            except FileNotFoundError:
+                if not metadata["covered_ranges"] or attempt == self.max_read_attempts - 1:
+                    return metadata, []
+
+    def read(self, connector_name: str, trading_pair: str, interval: str, start_time: int, end_time: int) -> pd.DataFrame:
+        """
+        Reads the stored candles with timestamp between start_time and end_time (both included).
+        """
+        metadata, segments = self.load_segments(connector_name, trading_pair, interval, start_time, end_time)
+        frames = []
+        for candles in segments:
+            timestamps = candles[:, 0]
+            start_index = np.searchsorted(timestamps, start_time, side="left")
+            end_index = np.searchsorted(timestamps, end_time, side="right")
+            frames.append(np.array(candles[start_index:end_index]))
+        return self.merge_segments(frames, metadata["columns"])
+
+    @staticmethod
+    def merge_segments(segments: List[np.ndarray], columns: List[str]) -> pd.DataFrame:
+        """
+        Stitches candles of segments in the order they were written. A candle fetched again is kept from the latest.
+        """
+        segments = [segment for segment in segments if len(segment) > 0]
+        if not segments:
+            return pd.DataFrame(columns=columns)
+        df = pd.DataFrame(np.concatenate(segments), columns=columns)
+        if len(segments) > 1:
+            df = df.drop_duplicates(subset=["timestamp"], keep="last").sort_values("timestamp").reset_index(drop=True)
+        return df
+
+    def write(self, connector_name: str, trading_pair: str, interval: str, candles_df: pd.DataFrame,
+              fetched_ranges: List[TimeRange]):
+        """
+        Appends the candles to the partition as a new segment and records the fetched ranges as covered, so a write
+        costs the new candles only. Once the partition has more than `max_segments` segments they are compacted into
+        one. The metadata that lists the segments replaces the previous one atomically, so concurrent readers see
+        either the previous partition or the new one. Blocking: async callers run it in a thread.
+        """
+        partition_path = self.get_partition_path(connector_name, trading_pair, interval)
+        os.makedirs(partition_path, exist_ok=True)
+        with file_lock(os.path.join(partition_path, self.lock_file_name)):
+            self._append_to_partition(partition_path, connector_name, trading_pair, interval, candles_df, fetched_ranges)
+
+    def _save_segment(self, partition_path: str, candles: np.ndarray) -> Dict:
+        file_name = f"candles_{time.time_ns()}_{os.getpid()}.npy"
+        with open(os.path.join(partition_path, file_name), "wb") as f:
+            np.save(f, candles)
+        return {"file": file_name, "start": float(candles[0, 0]), "end": float(candles[-1, 0])}
+
+    def _append_to_partition(self, partition_path: str, connector_name: str, trading_pair: str, interval: str,
+                             candles_df: pd.DataFrame, fetched_ranges: List[TimeRange]):
+        metadata = self.load_metadata(connector_name, trading_pair, interval)
+        columns = metadata["columns"] or list(candles_df.columns)
+        segments = metadata["segments"]
+        if not candles_df.empty:
+            new_df = candles_df[columns].drop_duplicates(subset=["timestamp"], keep="last").sort_values("timestamp")
+            segments.append(self._save_segment(partition_path, new_df.to_numpy(dtype=np.float64)))
+        removed_files = []
+        if len(segments) > self.max_segments:
+            compacted_df = self.merge_segments([np.load(os.path.join(partition_path, segment["file"]), mmap_mode="r")
+                                                for segment in segments], columns)
+            removed_files = [segment["file"] for segment in segments]
+            segments = [self._save_segment(partition_path, compacted_df.to_numpy(dtype=np.float64))]
+        metadata["columns"] = columns
+        metadata["segments"] = segments
+        metadata["covered_ranges"] = self.merge_ranges(
+            [tuple(r) for r in metadata["covered_ranges"]] + fetched_ranges,
+            self.get_interval_in_seconds(interval))
+
+        metadata_path = os.path.join(partition_path, self.metadata_file_name)
+        tmp_metadata_path = os.path.join(partition_path, f"tmp_{os.getpid()}_{self.metadata_file_name}")
+        with open(tmp_metadata_path, "w") as f:
+            json.dump(metadata, f)
+        os.replace(tmp_metadata_path, metadata_path)
+        # Readers that already mapped the compacted segments keep them until they release them.
+        for file_name in removed_files:
+            try:
+                os.remove(os.path.join(partition_path, file_name))
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def merge_ranges(ranges: List[TimeRange], interval_in_seconds: int) -> List[TimeRange]:
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1] + interval_in_seconds:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    def get_fetched_ranges(self, candles_df: pd.DataFrame, start_time: int, end_time: int,
+                           interval_in_seconds: int) -> List[TimeRange]:
+        """
+        Returns the ranges of [start_time, end_time] that the downloaded candles actually cover, so an empty or
+        truncated response is fetched again by the next request instead of being recorded as covered. A gap as long as
+        a whole download chunk means a chunk came back empty, so the ranges are split there; shorter gaps (e.g.
+        exchange maintenance) are covered.
+        """
+        if candles_df.empty or start_time > end_time:
+            return []
+        timestamps = candles_df["timestamp"].to_numpy(dtype=np.float64)
+        timestamps = np.unique(timestamps[(timestamps >= start_time) & (timestamps <= end_time)])
+        if len(timestamps) == 0:
+            return []
+        max_gap = self.download_planner.chunk_size * interval_in_seconds
+        split_indexes = np.flatnonzero(np.diff(timestamps) >= max_gap) + 1
+        starts = timestamps[np.r_[0, split_indexes]]
+        ends = timestamps[np.r_[split_indexes - 1, len(timestamps) - 1]]
+        return [(int(start), int(end)) for start, end in zip(starts, ends)]
+
+    @staticmethod
+    def get_missing_ranges(covered_ranges: List[TimeRange], start_time: int, end_time: int,
+                           interval_in_seconds: int) -> List[TimeRange]:
+        """
+        Returns the parts of [start_time, end_time] that are not covered, aligned to the candle open timestamps.
+        """
+        start = int(start_time - start_time % interval_in_seconds)
+        end = int(end_time - end_time % interval_in_seconds)
+        missing = []
+        for covered_start, covered_end in sorted(covered_ranges):
+            if covered_end < start:
+                continue
+            if covered_start > end:
+                break
+            if covered_start > start:
+                missing.append((start, covered_start - interval_in_seconds))
+            start = max(start, covered_end + interval_in_seconds)
+        if start <= end:
+            missing.append((start, end))
+        return missing
+
+    async def fetch_candles(self, config: HistoricalCandlesConfig) -> pd.DataFrame:
+        if config.connector_name not in self._connector_semaphores:
+            self._connector_semaphores[config.connector_name] = SharedSemaphore(
+                os.path.join(self.limits_path, f"{config.connector_name}.slot"), self.max_concurrent_requests_per_connector)
+        async with self._connector_semaphores[config.connector_name].acquire():
+            candles = CandlesFactory.get_candle(CandlesConfig(connector=config.connector_name,
+                                                              trading_pair=config.trading_pair,
+                                                              interval=config.interval))
+            return await candles.get_historical_candles(config=config)
+
+    def can_derive_interval(self, interval: str) -> bool:
+        base_interval_in_seconds = self.get_interval_in_seconds(self.base_interval)
+        interval_in_seconds = self.get_interval_in_seconds(interval)
+        # Only intervals that tile a day are aligned the same way by the exchanges and by the epoch.
+        return (interval != self.base_interval and interval_in_seconds is not None and
+                interval_in_seconds % base_interval_in_seconds == 0 and 86400 % interval_in_seconds == 0)
+
+    def derive_candles(self, config: HistoricalCandlesConfig) -> Optional[pd.DataFrame]:
+        """
+        Builds the candles of a higher interval from the stored base interval candles. Returns None when the stored
+        base candles don't cover every bucket of the requested range.
+        """
+        if not self.can_derive_interval(config.interval):
+            return None
+        interval_in_seconds = self.get_interval_in_seconds(config.interval)
+        base_interval_in_seconds = self.get_interval_in_seconds(self.base_interval)
+        start = config.start_time - config.start_time % interval_in_seconds
+        end = config.end_time - config.end_time % interval_in_seconds + interval_in_seconds - base_interval_in_seconds
+        metadata = self.load_metadata(config.connector_name, config.trading_pair, self.base_interval)
+        missing_ranges = self.get_missing_ranges([tuple(r) for r in metadata["covered_ranges"]], start, end,
+                                                 base_interval_in_seconds)
+        if missing_ranges or not metadata["columns"]:
+            return None
+        base_df = self.read(config.connector_name, config.trading_pair, self.base_interval, start, end)
+        df = resample_candles(base_df, interval_in_seconds)
+        df = df[(df["timestamp"] >= config.start_time) & (df["timestamp"] <= config.end_time)]
+        return df.reset_index(drop=True)
+
+    async def get_historical_candles(self, config: HistoricalCandlesConfig) -> pd.DataFrame:
+        interval_in_seconds = self.get_interval_in_seconds(config.interval)
+        if interval_in_seconds is None:
+            # Intervals without a fixed length (e.g. months) can't be split into ranges, so they are not stored.
+            return await self.fetch_candles(config)
+        derived_df = await asyncio.to_thread(self.derive_candles, config)
+        if derived_df is not None:
+            return derived_df
+        key = (config.connector_name, config.trading_pair, config.interval)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            metadata = self.load_metadata(*key)
+            missing_ranges = self.get_missing_ranges([tuple(r) for r in metadata["covered_ranges"]],
+                                                     config.start_time, config.end_time, interval_in_seconds)
+            fetched_dfs = []
+            if missing_ranges:
+                # The candle that is still open can change, so it is returned but never recorded as covered.
+                now = time.time()
+                last_closed_timestamp = int(now - now % interval_in_seconds) - interval_in_seconds
+                fetched_ranges = []
+                fetched_dfs = await asyncio.gather(*[
+                    self.download_planner.download(HistoricalCandlesConfig(
+                        connector_name=config.connector_name, trading_pair=config.trading_pair,
+                        interval=config.interval, start_time=start, end_time=end), interval_in_seconds)
+                    for start, end in missing_ranges])
+                for (start, end), range_df in zip(missing_ranges, fetched_dfs):
+                    fetched_ranges += self.get_fetched_ranges(range_df, start, min(end, last_closed_timestamp),
+                                                              interval_in_seconds)
+                fetched_df = pd.concat(fetched_dfs, ignore_index=True)
+                try:
+                    await asyncio.to_thread(self.write, *key, fetched_df[fetched_df["timestamp"] <= last_closed_timestamp],
+                                            fetched_ranges)
+                except Exception as e:
+                    logging.error(f"Error storing candles for {key}: {e}")
+            stored_df = await asyncio.to_thread(self.read, *key, config.start_time, config.end_time)
+        df = pd.concat([stored_df, *fetched_dfs], ignore_index=True) if fetched_dfs else stored_df
+        df = df.drop_duplicates(subset=["timestamp"], keep="last").sort_values("timestamp")
+        df = df[(df["timestamp"] >= config.start_time) & (df["timestamp"] <= config.end_time)]
+        return df.reset_index(drop=True)
@@ -0,0 +1,91 @@
+import json
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+import pandas as pd
+import pandas_ta as ta  # noqa: F401
+
+# Number of candles each indicator needs before its values are defined, as a function of its params. pandas_ta defaults
+# are used when a param is missing.
+INDICATORS_LOOKBACK = {
+    "bbands": lambda params: params.get("length", 5),
+    "macd": lambda params: params.get("slow", 26) + params.get("signal", 9),
+    "natr": lambda params: params.get("length", 14),
+    "supertrend": lambda params: params.get("length", 7),
+}
+# Indicators whose values only depend on the `lookback` candles before them. The others are recursive (EMA, RMA) or
+# path dependent (the ratcheting supertrend bands), so they depend on every candle of the window.
+WINDOWED_INDICATORS = {"bbands"}
+
+
+class IndicatorsService:
+    """
+    Computes indicators over candle windows and caches the results by candles key, indicator and params. When new
+    candles arrive, the windowed indicators only recompute the new candles and the start of the window (which moves
+    as old candles drop out) and keep the rest from the cache, which gives the same values as a full computation.
+    The other indicators are recomputed in full unless the candles didn't change.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def compute_indicator(candles_df: pd.DataFrame, name: str, params: Dict[str, Any]) -> pd.DataFrame:
+        if name not in INDICATORS_LOOKBACK:
+            raise ValueError(f"Indicator {name} is not supported, available: {list(INDICATORS_LOOKBACK)}")
+        df = candles_df.reset_index(drop=True)
+        result = getattr(df.ta, name)(**params)
+        if isinstance(result, pd.Series):
+            result = result.to_frame()
+        result.insert(0, "timestamp", df["timestamp"].values)
+        return result
+
+    def get_indicator(self, candles_key: Tuple, candles_df: pd.DataFrame, name: str,
+                      params: Dict[str, Any]) -> pd.DataFrame:
+        candles_df = candles_df.drop_duplicates(subset=["timestamp"]).reset_index(drop=True)
+        cache_key = (candles_key, name, json.dumps(params, sort_keys=True))
+        last_candle = candles_df.iloc[-1]
+        cached = self._cache.get(cache_key)
+        if cached is not None and cached["last_timestamp"] == last_candle["timestamp"] and \
+                cached["last_close"] == last_candle["close"]:
+            self.hits += 1
+            result = cached["result"]
+        elif self.can_update_tail(cached, candles_df, name, params):
+            # The last cached candle may have been updated while it was open, so it is recomputed with the new ones.
+            self.partial_hits += 1
+            lookback = INDICATORS_LOOKBACK[name](params)
+            new_candles = int((candles_df["timestamp"] >= cached["last_timestamp"]).sum())
+            head = self.compute_indicator(candles_df.iloc[:lookback], name, params)
+            tail = self.compute_indicator(candles_df.iloc[-(new_candles + lookback):], name, params).iloc[-new_candles:]
+            middle = cached["result"]
+            middle = middle[(middle["timestamp"] >= candles_df["timestamp"].iloc[lookback]) &
+                            (middle["timestamp"] < cached["last_timestamp"])]
+            result = pd.concat([head, middle, tail], ignore_index=True)
+        else:
+            self.misses += 1
+            result = self.compute_indicator(candles_df, name, params)
+        self._cache[cache_key] = {"last_timestamp": last_candle["timestamp"], "last_close": last_candle["close"],
+                                  "result": result}
+        self._cache.move_to_end(cache_key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return result
+
+    @staticmethod
+    def can_update_tail(cached: Dict[str, Any], candles_df: pd.DataFrame, name: str, params: Dict[str, Any]) -> bool:
+        if cached is None or name not in WINDOWED_INDICATORS:
+            return False
+        timestamps = candles_df["timestamp"]
+        new_candles = int((timestamps >= cached["last_timestamp"]).sum())
+        # The head and tail recomputations must not overlap, and the cached rows must reach the head of the window.
+        return (cached["last_timestamp"] in timestamps.values and
+                len(candles_df) > new_candles + 2 * INDICATORS_LOOKBACK[name](params) and
+                cached["result"]["timestamp"].iloc[0] <= timestamps.iloc[0])
+
+    def get_metrics(self):
+        return {"entries": len(self._cache), "hits": self.hits, "partial_hits": self.partial_hits,
+                "misses": self.misses}
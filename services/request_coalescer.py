@@ -0,0 +1,47 @@
+import asyncio
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class RequestCoalescer:
+    """
+    Singleflight for coroutines: concurrent calls with the same key share a single in-flight task and all of them
+    receive its result (or exception). The task is shielded, so a caller that disconnects doesn't cancel the work for
+    the rest of them.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._in_flight_metrics: Dict[Hashable, str] = {}
+        self._requests = defaultdict(int)
+        self._merged_requests = defaultdict(int)
+
+    async def run(self, key: Hashable, coroutine_factory: Callable[[], Awaitable[Any]], metric: str = "default"):
+        self._requests[metric] += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coroutine_factory())
+            self._in_flight[key] = task
+            self._in_flight_metrics[key] = metric
+            task.add_done_callback(lambda t: self._on_task_done(key, t))
+        else:
+            self._merged_requests[metric] += 1
+        return await asyncio.shield(task)
+
+    def _on_task_done(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+            del self._in_flight_metrics[key]
+        if not task.cancelled():
+            # Retrieve the exception so it is not reported as unhandled when every caller went away.
+            task.exception()
+
+    def get_metrics(self):
+        return {
+            metric: {
+                "requests": requests,
+                "merged_requests": self._merged_requests[metric],
+                "in_flight": sum(1 for in_flight_metric in self._in_flight_metrics.values() if in_flight_metric == metric),
+            }
+            for metric, requests in self._requests.items()
+        }
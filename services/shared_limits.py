@@ -0,0 +1,99 @@
+import asyncio
+import fcntl
+import json
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+
+@contextmanager
+def file_lock(lock_path: str):
+    """
+    Holds an exclusive flock on the lock file, so the block runs in one process (or one open of the file) at a time.
+    The kernel releases the lock if the process dies.
+    """
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    with open(lock_path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class SharedTokenBucket:
+    """
+    Token bucket with the interface of TokenBucket whose state is kept in a file, so every process that uses the same
+    path (API process and backtesting workers) draws from a single bucket.
+    """
+
+    def __init__(self, path: str, rate: float, capacity: float):
+        self.path = path
+        self.rate = rate
+        self.capacity = capacity
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def _take(self, tokens: float) -> float:
+        """
+        Refills the bucket and takes the tokens if they are available. Returns the tokens that are still missing.
+        """
+        with open(self.path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                now = time.time()
+                try:
+                    state = json.loads(f.read())
+                except ValueError:
+                    state = {"tokens": self.capacity, "last_refill": now}
+                available = min(self.capacity, state["tokens"] + max(now - state["last_refill"], 0) * self.rate)
+                missing = max(tokens - available, 0)
+                if not missing:
+                    available -= tokens
+                f.seek(0)
+                f.truncate()
+                json.dump({"tokens": available, "last_refill": now}, f)
+            finally:
+                f.flush()
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return missing
+
+    async def acquire(self, tokens: float = 1):
+        missing = self._take(tokens)
+        while missing:
+            await asyncio.sleep(missing / self.rate)
+            missing = self._take(tokens)
+
+
+class SharedSemaphore:
+    """
+    Semaphore shared by every process that uses the same path: each holder keeps an flock on one of `value` slot
+    files, and the slots of a process that dies are freed by the kernel.
+    """
+
+    def __init__(self, path: str, value: int, poll_interval: float = 0.05):
+        self.slot_paths = [f"{path}.{slot}" for slot in range(value)]
+        self.poll_interval = poll_interval
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def _try_acquire_slot(self):
+        for slot_path in self.slot_paths:
+            f = open(slot_path, "a")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return f
+            except BlockingIOError:
+                f.close()
+        return None
+
+    @asynccontextmanager
+    async def acquire(self):
+        slot = self._try_acquire_slot()
+        while slot is None:
+            await asyncio.sleep(self.poll_interval)
+            slot = self._try_acquire_slot()
+        try:
+            yield
+        finally:
+            fcntl.flock(slot, fcntl.LOCK_UN)
+            slot.close()
@@ -0,0 +1,81 @@
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from services.vectorized_backtesting_engine import VectorizedBacktestingEngine
+
+EventsCallback = Callable[[str, Any], None]
+
+
+class StreamingBacktestingEngine(VectorizedBacktestingEngine):
+    """
+    Backtesting engine that reports its progress while it runs. When an events callback is set it is called with
+    ("progress", {...}) about every percent of the candles processed and with ("executors", [...]) for every batch
+    of `executors_batch_size` executors that stopped, so clients can show results before the backtest finishes.
+    """
+    executors_batch_size = 100
+
+    def __init__(self):
+        super().__init__()
+        self.events_callback: Optional[EventsCallback] = None
+        self._total_rows = 0
+        self._processed_rows = 0
+        self._progress_step = 1
+        self._streamed_executors = 0
+        self._streamed_executors_ids = set()
+
+    @property
+    def streamed_rows(self) -> int:
+        return self._processed_rows
+
+    def set_events_callback(self, events_callback: Optional[EventsCallback], executors_batch_size: int = 100):
+        self.events_callback = events_callback
+        self.executors_batch_size = executors_batch_size
+        self._total_rows = 0
+        self._processed_rows = 0
+        self._streamed_executors = 0
+        self._streamed_executors_ids = set()
+
+    def emit_progress(self):
+        percent = 100 * self._processed_rows / self._total_rows if self._total_rows else 100
+        self.events_callback("progress", {"processed_candles": self._processed_rows, "total_candles": self._total_rows,
+                                          "percent": round(percent, 2)})
+
+    def emit_executors(self, executors: List[Dict]):
+        for i in range(0, len(executors), self.executors_batch_size):
+            self.events_callback("executors", executors[i:i + self.executors_batch_size])
+
+    def prepare_market_data(self) -> pd.DataFrame:
+        processed_features = super().prepare_market_data()
+        if self.events_callback is not None:
+            self._total_rows = len(processed_features)
+            self._progress_step = max(self._total_rows // 100, 1)
+            self.emit_progress()
+        return processed_features
+
+    async def update_state(self, row):
+        await super().update_state(row)
+        if self.events_callback is None:
+            return
+        self._processed_rows += 1
+        pending_executors = len(self.stopped_executors_info) - self._streamed_executors
+        if pending_executors >= self.executors_batch_size:
+            self._stream_stopped_executors()
+        if self._processed_rows % self._progress_step == 0:
+            self.emit_progress()
+
+    def _stream_stopped_executors(self):
+        executors_info = self.stopped_executors_info[self._streamed_executors:]
+        self._streamed_executors = len(self.stopped_executors_info)
+        self._streamed_executors_ids.update(executor_info.id for executor_info in executors_info)
+        self.emit_executors([executor_info.to_dict() for executor_info in executors_info])
+
+    async def simulate_execution(self, trade_cost: float) -> list:
+        executors_info = await super().simulate_execution(trade_cost)
+        if self.events_callback is not None:
+            # The executors still active at the end and the ones of the vectorized path are sent once it finishes.
+            self.emit_executors([executor_info.to_dict() for executor_info in executors_info
+                                 if executor_info.id not in self._streamed_executors_ids])
+            self._processed_rows = self._total_rows
+            self.emit_progress()
+        return executors_info
@@ -0,0 +1,176 @@
+import logging
+from decimal import Decimal
+from typing import List, Optional, Tuple
+
+import numpy as np
+from hummingbot.core.data_type.common import OrderType, TradeType
+from hummingbot.strategy_v2.backtesting.backtesting_engine_base import BacktestingEngineBase
+from hummingbot.strategy_v2.controllers.directional_trading_controller_base import DirectionalTradingControllerBase
+from hummingbot.strategy_v2.models.base import RunnableStatus
+from hummingbot.strategy_v2.models.executors import CloseType
+from hummingbot.strategy_v2.models.executors_info import ExecutorInfo
+
+# Methods of the directional controller base that decide which executors are created. Controllers that override any
+# of them can create executors the fast path doesn't know about, so they run on the event-by-event simulation.
+DIRECTIONAL_ACTIONS_METHODS = [
+    "determine_executor_actions",
+    "create_actions_proposal",
+    "stop_actions_proposal",
+    "can_create_executor",
+    "get_executor_config",
+]
+
+
+class VectorizedBacktestingEngine(BacktestingEngineBase):
+    """
+    Backtesting engine with a fast path for directional controllers that only create market-entry position executors
+    with a triple barrier. The signals are already computed over the whole candles frame by the controller, so instead
+    of replaying every candle the engine walks only the rows with a signal and resolves the take profit, stop loss and
+    time limit of each executor with NumPy first-passage searches over the closes. The exits follow the same rules as
+    the position executor simulator, so the results match the event-by-event simulation. Any other controller falls
+    back to the standard simulation.
+    """
+    vectorized: bool = False
+    initial_search_window = 64
+
+    def supports_vectorized_execution(self) -> bool:
+        if not isinstance(self.controller, DirectionalTradingControllerBase):
+            return False
+        controller_class = type(self.controller)
+        for method_name in DIRECTIONAL_ACTIONS_METHODS:
+            if getattr(controller_class, method_name) is not getattr(DirectionalTradingControllerBase, method_name):
+                return False
+        triple_barrier_config = self.controller.config.triple_barrier_config
+        return triple_barrier_config.trailing_stop is None and triple_barrier_config.open_order_type == OrderType.MARKET
+
+    async def simulate_execution(self, trade_cost: float) -> list:
+        if self.vectorized:
+            if self.supports_vectorized_execution():
+                return self.simulate_vectorized_execution(trade_cost)
+            logging.info(f"Controller {self.controller.config.controller_name} is not supported by the vectorized "
+                         f"backtesting, running the standard simulation.")
+        return await super().simulate_execution(trade_cost)
+
+    def simulate_vectorized_execution(self, trade_cost: float) -> List[ExecutorInfo]:
+        processed_features = self.prepare_market_data()
+        config = self.controller.config
+        timestamps = processed_features["timestamp"].to_numpy(dtype=np.float64)
+        closes = processed_features["close"].to_numpy(dtype=np.float64)
+        lows = processed_features["low"].to_numpy(dtype=np.float64)
+        highs = processed_features["high"].to_numpy(dtype=np.float64)
+        prices = processed_features["close_bt"].to_numpy(dtype=np.float64)
+        signals = processed_features["signal"].to_numpy(dtype=np.float64)
+        triple_barrier_config = config.triple_barrier_config
+        take_profit = float(triple_barrier_config.take_profit) if triple_barrier_config.take_profit else None
+        stop_loss = float(triple_barrier_config.stop_loss) if triple_barrier_config.stop_loss else None
+        time_limit = triple_barrier_config.time_limit if triple_barrier_config.time_limit else None
+
+        # Active executors as (side, timestamp, close timestamp), executors as (detection row, creation order, info).
+        active_executors: List[Tuple[TradeType, float, float]] = []
+        executors = []
+        n_rows = len(timestamps)
+        for row in np.flatnonzero(signals != 0):
+            # The executors created on the last row are never updated by the simulation, so they are not reported.
+            if row == n_rows - 1:
+                break
+            timestamp = timestamps[row]
+            trade_type = TradeType.BUY if signals[row] > 0 else TradeType.SELL
+            active_executors = [e for e in active_executors if timestamp < e[2]]
+            # As in can_create_executor, long signals only count the active longs but short signals count every active
+            # executor, since its side filter evaluates to TradeType.SELL for them.
+            side_executors = [e for e in active_executors if trade_type == TradeType.SELL or e[0] == TradeType.BUY]
+            max_timestamp = max([e[1] for e in side_executors], default=0)
+            if len(side_executors) >= config.max_executors_per_side or timestamp - max_timestamp <= config.cooldown_time:
+                continue
+
+            self.controller.market_data_provider._time = timestamp
+            price = Decimal(prices[row])
+            amount = config.total_amount_quote / price / Decimal(config.max_executors_per_side)
+            executor_config = self.controller.get_executor_config(trade_type, price, amount)
+            side_multiplier = 1 if trade_type == TradeType.BUY else -1
+            end_row = n_rows - 1
+            if time_limit:
+                end_row = int(np.searchsorted(timestamps, timestamp + time_limit, side="right")) - 1
+            close_row, close_type, net_pnl_pct = self.find_first_passage(
+                closes, lows, highs, row, end_row, side_multiplier, trade_cost, take_profit, stop_loss)
+
+            filled_amount_quote = float(executor_config.amount) * closes[row]
+            executor_info = ExecutorInfo(
+                id=executor_config.id,
+                timestamp=executor_config.timestamp,
+                type=executor_config.type,
+                close_timestamp=float(timestamps[close_row]),
+                close_type=close_type,
+                status=RunnableStatus.TERMINATED,
+                config=executor_config,
+                net_pnl_pct=Decimal(net_pnl_pct),
+                net_pnl_quote=Decimal(net_pnl_pct * filled_amount_quote),
+                cum_fees_quote=Decimal(trade_cost * filled_amount_quote),
+                filled_amount_quote=Decimal(filled_amount_quote * 2),
+                is_active=False,
+                is_trading=False,
+                custom_info={
+                    "close_price": closes[close_row],
+                    "level_id": executor_config.level_id,
+                    "side": executor_config.side,
+                    "current_position_average_price": float(executor_config.entry_price),
+                },
+            )
+            active_executors.append((trade_type, timestamp, timestamps[close_row]))
+            # The simulation reports an executor as stopped on the first row after its creation that reaches its close.
+            executors.append((max(close_row, row + 1), len(executors), executor_info))
+
+        executors_info = [executor_info for _, _, executor_info in sorted(executors, key=lambda e: e[:2])]
+        self.controller.executors_info = executors_info
+        return executors_info
+
+    def find_first_passage(self, closes: np.ndarray, lows: np.ndarray, highs: np.ndarray, start_row: int, end_row: int,
+                           side_multiplier: int, trade_cost: float, take_profit: Optional[float],
+                           stop_loss: Optional[float]) -> Tuple[int, CloseType, float]:
+        """
+        Returns the row where the executor opened at start_row closes, the close type and its net pnl pct. The take
+        profit is checked on the net pnl of the closes and the stop loss on the lows (highs for shorts) against the stop
+        price, searching windows of growing size so executors that close early don't scan the rest of the candles.
+        """
+        entry_price = closes[start_row]
+        stop_loss_price = entry_price * (1 - stop_loss * side_multiplier) if stop_loss else None
+        cumulative_factor = 1.0
+        window_start = start_row
+        window_size = self.initial_search_window
+        while window_start <= end_row:
+            window_end = min(window_start + window_size, end_row + 1)
+            # Same operations as the position executor simulator: compounded close-to-close returns minus the cost. The
+            # product of the previous windows goes into the first factor so the cumulative product stays sequential.
+            factors = self._get_return_factors(closes, start_row, window_start, window_end)
+            factors[0] *= cumulative_factor
+            cumulative_returns = np.cumprod(factors)
+            net_pnl_pct = (cumulative_returns - 1) * side_multiplier - trade_cost
+
+            take_profit_hits = np.flatnonzero(net_pnl_pct > take_profit) if take_profit else np.empty(0, dtype=int)
+            if stop_loss_price is None:
+                stop_loss_hits = np.empty(0, dtype=int)
+            elif side_multiplier == 1:
+                stop_loss_hits = np.flatnonzero(lows[window_start:window_end] <= stop_loss_price)
+            else:
+                stop_loss_hits = np.flatnonzero(highs[window_start:window_end] >= stop_loss_price)
+            first_take_profit = take_profit_hits[0] if len(take_profit_hits) else None
+            first_stop_loss = stop_loss_hits[0] if len(stop_loss_hits) else None
+            if first_take_profit is not None and (first_stop_loss is None or first_take_profit <= first_stop_loss):
+                return window_start + first_take_profit, CloseType.TAKE_PROFIT, float(net_pnl_pct[first_take_profit])
+            if first_stop_loss is not None:
+                return window_start + first_stop_loss, CloseType.STOP_LOSS, float(net_pnl_pct[first_stop_loss])
+            if window_end > end_row:
+                return end_row, CloseType.TIME_LIMIT, float(net_pnl_pct[-1])
+            cumulative_factor = cumulative_returns[-1]
+            window_start = window_end
+            window_size *= 2
+        return end_row, CloseType.TIME_LIMIT, -trade_cost
+
+    @staticmethod
+    def _get_return_factors(closes: np.ndarray, start_row: int, window_start: int, window_end: int) -> np.ndarray:
+        factors = np.ones(window_end - window_start)
+        # The entry row has no return, the rest compound the change over the previous close.
+        first_return_row = max(window_start, start_row + 1)
+        factors[first_return_row - window_start:] = 1 + (closes[first_return_row:window_end] /
+                                                         closes[first_return_row - 1:window_end - 1] - 1)
+        return factors
@@ -0,0 +1,46 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from services.backtesting_monte_carlo import METRICS, MONTE_CARLO_METHODS, run_monte_carlo
+
+
+class InlineJobManager:
+    """
+    Runs the jobs in the test process instead of the pool.
+    """
+
+    async def run_function(self, job_function, job_config):
+        return job_function(job_config)
+
+
+def get_executors(n_executors: int = 40, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    return [{"net_pnl_quote": pnl, "filled_amount_quote": 200.0} for pnl in rng.normal(0.1, 1.0, n_executors)]
+
+
+@pytest.mark.parametrize("method", MONTE_CARLO_METHODS)
+def test_every_method_summarizes_the_distributions(method):
+    results = asyncio.run(run_monte_carlo(InlineJobManager(), get_executors(), method=method, n_simulations=2500,
+                                          seed=7, bins=20))
+    assert results["n_simulations"] == 2500
+    assert set(results["distributions"]) == set(METRICS)
+    for distribution in results["distributions"].values():
+        assert sum(distribution["histogram"]["counts"]) <= 2500
+        assert len(distribution["histogram"]["edges"]) == len(distribution["histogram"]["counts"]) + 1
+
+
+def test_permutations_keep_the_final_pnl():
+    executors = get_executors()
+    results = asyncio.run(run_monte_carlo(InlineJobManager(), executors, method="permutation", n_simulations=1000,
+                                          seed=7))
+    net_pnl_quote = results["distributions"]["net_pnl_quote"]
+    assert net_pnl_quote["histogram"]["counts"] == [1000]
+    assert net_pnl_quote["mean"] == pytest.approx(sum(e["net_pnl_quote"] for e in executors))
+
+
+def test_a_seed_reproduces_the_results():
+    results = [asyncio.run(run_monte_carlo(InlineJobManager(), get_executors(), n_simulations=1500, seed=11))
+               for _ in range(2)]
+    assert results[0] == results[1]
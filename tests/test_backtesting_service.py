@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.backtesting_service import select_processed_data, with_controller_id
+
+
+def get_processed_data(n_rows: int, start: int = 1672542000, interval: int = 60) -> pd.DataFrame:
+    timestamps = start + interval * np.arange(n_rows)
+    return pd.DataFrame({"timestamp": timestamps.astype(float), "close": np.linspace(100, 110, n_rows),
+                         "volume": np.ones(n_rows), "signal": np.arange(n_rows) % 3 - 1})
+
+
+@pytest.mark.parametrize("n_rows, max_points", [(1440, 100), (43200, 1000), (1000, 7), (999, 2), (10000, 333),
+                                                (101, 100), (5000, 4999)])
+def test_max_points_is_respected(n_rows, max_points):
+    for start in [1672542000, 1672542060, 1672542137 * 60]:
+        result = select_processed_data(get_processed_data(n_rows, start=start), max_points=max_points)
+        assert 1 < len(result) <= max_points
+
+
+def test_max_points_keeps_the_data_that_fits():
+    processed_data = get_processed_data(50)
+    pd.testing.assert_frame_equal(select_processed_data(processed_data, max_points=100), processed_data)
+
+
+def test_downsampling_aggregates_the_candles_columns():
+    result = select_processed_data(get_processed_data(120), interval="1h")
+    assert len(result) == 2
+    assert result["volume"].tolist() == [60, 60]
+
+
+def test_columns_are_selected_with_the_timestamp():
+    result = select_processed_data(get_processed_data(10), columns=["signal"])
+    assert list(result.columns) == ["timestamp", "signal"]
+
+
+def test_cached_executors_get_the_controller_id():
+    backtesting_results = {
+        "executors": [{"id": "a", "controller_id": "cached", "config": {"controller_id": "cached", "amount": 1}},
+                      {"id": "b", "controller_id": None, "config": {"controller_id": "cached"}}],
+        "results": {"net_pnl": 1},
+    }
+    results = with_controller_id(backtesting_results, "current")
+    assert [e["config"]["controller_id"] for e in results["executors"]] == ["current", "current"]
+    assert [e["controller_id"] for e in results["executors"]] == ["current", None]
+    assert results["executors"][0]["config"]["amount"] == 1
+    assert backtesting_results["executors"][0]["config"]["controller_id"] == "cached"
@@ -0,0 +1,35 @@
+import pytest
+
+from services.backtesting_walk_forward import ADDITIVE_RESULTS, aggregate_out_of_sample_results, get_walk_forward_windows
+
+
+def test_windows_move_forward_by_the_test_duration():
+    windows = get_walk_forward_windows(0, 100, train_duration=40, test_duration=20)
+    assert [(w["train_start"], w["test_end"]) for w in windows] == [(0, 60), (20, 80), (40, 100)]
+
+
+def test_anchored_windows_train_from_the_start():
+    windows = get_walk_forward_windows(0, 100, train_duration=40, test_duration=20, step=30, anchored=True)
+    assert [(w["train_start"], w["train_end"]) for w in windows] == [(0, 40), (0, 70)]
+
+
+@pytest.mark.parametrize("step", [0, -1, -3600])
+def test_non_positive_step_is_rejected(step):
+    with pytest.raises(ValueError):
+        get_walk_forward_windows(0, 100, train_duration=40, test_duration=20, step=step)
+
+
+def test_range_shorter_than_one_window_is_rejected():
+    with pytest.raises(ValueError):
+        get_walk_forward_windows(0, 50, train_duration=40, test_duration=20)
+
+
+def test_walk_forward_efficiency_compares_pnl_per_unit_of_time():
+    windows_results = [{"train_start": 0, "train_end": 300, "test_start": 300, "test_end": 400,
+                        "train_results": {"net_pnl": 0.03},
+                        "test_results": {**{field: 0 for field in ADDITIVE_RESULTS}, "net_pnl": 0.01, "net_pnl_quote": 1,
+                                         "max_drawdown_usd": 0, "max_drawdown_pct": 0}},
+                       {"train_start": 100, "train_end": 400, "error": "Every combination failed on the train window"}]
+    aggregated = aggregate_out_of_sample_results(windows_results)
+    # The test window earned as much per second as the train window, so the in-sample performance held.
+    assert aggregated["walk_forward_efficiency"] == pytest.approx(1)
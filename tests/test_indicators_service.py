@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pandas_ta")
+
+from services.indicators_service import INDICATORS_LOOKBACK, IndicatorsService  # noqa: E402
+
+
+def get_candles(n_candles: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, n_candles)))
+    spread = np.abs(rng.normal(0, 0.001, n_candles)) * close
+    return pd.DataFrame({"timestamp": 1672542000 + 60 * np.arange(n_candles, dtype=float),
+                         "open": close, "high": close + spread, "low": close - spread, "close": close,
+                         "volume": rng.uniform(1, 10, n_candles)})
+
+
+@pytest.mark.parametrize("name", list(INDICATORS_LOOKBACK))
+def test_cached_results_match_a_full_computation(name):
+    candles = get_candles(1500)
+    service = IndicatorsService()
+    # Live feeds keep a fixed number of candles: new ones are appended, the oldest drop out, the last one is updated.
+    windows = [candles.iloc[0:1000], candles.iloc[5:1005], candles.iloc[5:1005], candles.iloc[30:1030]]
+    updated_window = candles.iloc[31:1031].copy()
+    updated_window.loc[updated_window.index[-1], "close"] *= 1.01
+    for window in windows + [updated_window]:
+        cached = service.get_indicator(("binance", "BTC-USDT", "1m"), window, name, {})
+        expected = IndicatorsService.compute_indicator(window, name, {})
+        assert list(cached.columns) == list(expected.columns)
+        np.testing.assert_allclose(cached.to_numpy(dtype=float), expected.to_numpy(dtype=float), rtol=1e-9, atol=1e-12)
+    assert service.hits == 1
+
+
+def test_unsupported_indicator_is_rejected():
+    with pytest.raises(ValueError):
+        IndicatorsService.compute_indicator(get_candles(10), "unknown", {})
@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("hummingbot")
+
+from hummingbot.core.data_type.common import OrderType, TradeType  # noqa: E402
+from hummingbot.strategy_v2.backtesting.executors_simulator.position_executor_simulator import (  # noqa: E402
+    PositionExecutorSimulator,
+)
+from hummingbot.strategy_v2.executors.position_executor.data_types import (  # noqa: E402
+    PositionExecutorConfig,
+    TripleBarrierConfig,
+)
+
+from services.vectorized_backtesting_engine import VectorizedBacktestingEngine  # noqa: E402
+
+TRADE_COST = 0.0006
+
+
+def get_candles(n_candles: int = 400, seed: int = 11) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, n_candles)))
+    open_ = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({"timestamp": 1672542000 + 60 * np.arange(n_candles, dtype=float),
+                         "open": open_,
+                         "high": np.maximum(open_, close) * (1 + rng.uniform(0, 0.002, n_candles)),
+                         "low": np.minimum(open_, close) * (1 - rng.uniform(0, 0.002, n_candles)),
+                         "close": close})
+
+
+def get_engine() -> VectorizedBacktestingEngine:
+    # find_first_passage only depends on the candles, so the engine doesn't need a data provider.
+    engine = VectorizedBacktestingEngine.__new__(VectorizedBacktestingEngine)
+    # A small first window makes the searches span several windows.
+    engine.initial_search_window = 4
+    return engine
+
+
+@pytest.mark.parametrize("side", [TradeType.BUY, TradeType.SELL])
+@pytest.mark.parametrize("take_profit, stop_loss, time_limit", [
+    (0.003, 0.004, 1800),
+    (0.003, None, 3600),
+    (None, 0.004, 3600),
+    (0.02, 0.03, 600),
+    (0.01, 0.01, None),
+])
+@pytest.mark.parametrize("start_row", [0, 57, 390])
+def test_first_passage_matches_the_position_executor_simulator(side, take_profit, stop_loss, time_limit, start_row):
+    candles = get_candles()
+    timestamps = candles["timestamp"].to_numpy()
+    config = PositionExecutorConfig(
+        timestamp=timestamps[start_row], connector_name="binance_perpetual", trading_pair="BTC-USDT", side=side,
+        entry_price=Decimal(candles["close"].iloc[start_row]), amount=Decimal(1),
+        triple_barrier_config=TripleBarrierConfig(
+            take_profit=Decimal(str(take_profit)) if take_profit else None,
+            stop_loss=Decimal(str(stop_loss)) if stop_loss else None,
+            time_limit=time_limit, open_order_type=OrderType.MARKET))
+    simulation = PositionExecutorSimulator().simulate(candles.loc[start_row:], config, TRADE_COST)
+
+    end_row = len(timestamps) - 1
+    if time_limit:
+        end_row = int(np.searchsorted(timestamps, timestamps[start_row] + time_limit, side="right")) - 1
+    close_row, close_type, net_pnl_pct = get_engine().find_first_passage(
+        candles["close"].to_numpy(), candles["low"].to_numpy(), candles["high"].to_numpy(), start_row, end_row,
+        1 if side == TradeType.BUY else -1, TRADE_COST, take_profit, stop_loss)
+
+    last_entry = simulation.executor_simulation.iloc[-1]
+    assert timestamps[close_row] == last_entry["timestamp"]
+    assert close_type == simulation.close_type
+    assert net_pnl_pct == pytest.approx(last_entry["net_pnl_pct"], abs=1e-12)
@@ -0,0 +1,100 @@
+import json
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+@lru_cache(maxsize=None)
+def _is_available(module_name: str) -> bool:
+    try:
+        __import__(module_name)
+        return True
+    except ImportError:
+        return False
+
+
+def get_response_format(accept: Optional[str]) -> str:
+    """
+    Picks the response format from the Accept header, honoring the q-values. Binary formats are only chosen when their
+    library is installed, otherwise the response falls back to JSON.
+    :param accept: The Accept header of the request.
+    :return: "arrow", "msgpack" or "json".
+    """
+    if not accept:
+        return "json"
+    media_types = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        media_types.append((-quality, position, media_type.lower()))
+    for _, _, media_type in sorted(media_types):
+        if media_type == ARROW_MEDIA_TYPE and _is_available("pyarrow"):
+            return "arrow"
+        if media_type in MSGPACK_MEDIA_TYPES and _is_available("msgpack"):
+            return "msgpack"
+        if media_type in ("application/json", "*/*", "application/*"):
+            return "json"
+    return "json"
+
+
+def dataframe_to_arrow(df: pd.DataFrame, metadata: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    Serializes the DataFrame as an Arrow IPC stream. Extra metadata is stored JSON encoded in the schema metadata.
+    """
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if metadata:
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            **{key: json.dumps(jsonable_encoder(value)) for key, value in metadata.items()}
+        })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def dataframe_to_columns(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Compact column layout for msgpack: numeric columns are sent as raw little-endian buffers described by their dtype,
+    the rest as plain lists.
+    """
+    columns = {}
+    for column in df.columns:
+        values = df[column].to_numpy()
+        if values.dtype.kind in "biuf":
+            values = values.astype(values.dtype.newbyteorder("<"), copy=False)
+            columns[str(column)] = {"dtype": values.dtype.str, "data": np.ascontiguousarray(values).tobytes()}
+        else:
+            columns[str(column)] = {"dtype": "object", "data": jsonable_encoder(values.tolist())}
+    return {"length": len(df), "columns": columns}
+
+
+def dataframe_response(df: pd.DataFrame, response_format: str,
+                       metadata: Optional[Dict[str, Any]] = None) -> Optional[Response]:
+    """
+    Builds the binary response for the DataFrame, or returns None when the JSON fallback should be used.
+    """
+    if response_format == "arrow":
+        return Response(content=dataframe_to_arrow(df, metadata), media_type=ARROW_MEDIA_TYPE)
+    if response_format == "msgpack":
+        import msgpack
+
+        content = {key: jsonable_encoder(value) for key, value in (metadata or {}).items()}
+        content["data"] = dataframe_to_columns(df)
+        return Response(content=msgpack.packb(content, use_bin_type=True), media_type=MSGPACK_MEDIA_TYPES[0])
+    return None
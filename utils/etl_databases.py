@@ -1,7 +1,9 @@
 import os
+import numpy as np
 import pandas as pd
 import json
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple, get_args
 
 from hummingbot.core.data_type.common import TradeType
 from hummingbot.strategy_v2.models.base import RunnableStatus
@@ -10,6 +12,33 @@ from hummingbot.strategy_v2.models.executors_info import ExecutorInfo
 from sqlalchemy import create_engine, insert, text, MetaData, Table, Column, VARCHAR, INT, FLOAT,  Integer, String, Float
 from sqlalchemy.orm import sessionmaker
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_loads(value):
+    if orjson is not None:
+        try:
+            return orjson.loads(value)
+        except orjson.JSONDecodeError:
+            pass  # e.g. NaN literals or big integers, which only the standard decoder accepts
+    return json.loads(value)
+
+
+# Fields of ExecutorInfo, in the order of the executors table.
+EXECUTOR_INFO_FIELDS = ["id", "timestamp", "type", "close_timestamp", "close_type", "status", "config", "net_pnl_pct",
+                        "net_pnl_quote", "cum_fees_quote", "filled_amount_quote", "is_active", "is_trading",
+                        "custom_info", "controller_id"]
+# Summary of BacktestingEngineBase.summarize_results without executors.
+EMPTY_RESULTS = {
+    "net_pnl": 0, "net_pnl_quote": 0, "total_executors": 0, "total_executors_with_position": 0, "total_volume": 0,
+    "total_long": 0, "total_short": 0, "close_types": 0, "accuracy_long": 0, "accuracy_short": 0, "total_positions": 0,
+    "accuracy": 0, "max_drawdown_usd": 0, "max_drawdown_pct": 0, "sharpe_ratio": 0, "profit_factor": 0,
+    "win_signals": 0, "loss_signals": 0,
+}
+
 
 class HummingbotDatabase:
     def __init__(self, db_path: str):
@@ -307,54 +336,124 @@ class PerformanceDataSource:
     @property
     def executors_df(self):
         executors = pd.DataFrame(self.executors_dict)
-        executors["custom_info"] = executors["custom_info"].apply(
-            lambda x: json.loads(x) if isinstance(x, str) else x)
-        executors["config"] = executors["config"].apply(lambda x: json.loads(x) if isinstance(x, str) else x)
-        executors["timestamp"] = executors["timestamp"].apply(lambda x: self.ensure_timestamp_in_seconds(x))
-        executors["close_timestamp"] = executors["close_timestamp"].apply(
-            lambda x: self.ensure_timestamp_in_seconds(x))
-        executors["trading_pair"] = executors["config"].apply(lambda x: x["trading_pair"])
-        executors["exchange"] = executors["config"].apply(lambda x: x["connector_name"])
-        executors["level_id"] = executors["config"].apply(lambda x: x.get("level_id"))
-        executors["bep"] = executors["custom_info"].apply(lambda x: x["current_position_average_price"])
-        executors["order_ids"] = executors["custom_info"].apply(lambda x: x.get("order_ids"))
-        executors["close_price"] = executors["custom_info"].apply(lambda x: x.get("close_price", x["current_position_average_price"]))
-        executors["sl"] = executors["config"].apply(lambda x: x.get("stop_loss")).fillna(0)
-        executors["tp"] = executors["config"].apply(lambda x: x.get("take_profit")).fillna(0)
-        executors["tl"] = executors["config"].apply(lambda x: x.get("time_limit")).fillna(0)
+        executors["custom_info"] = self.parse_json_column(executors["custom_info"])
+        executors["config"] = self.parse_json_column(executors["config"])
+        executors["timestamp"] = self.ensure_timestamps_in_seconds(executors["timestamp"])
+        executors["close_timestamp"] = self.ensure_timestamps_in_seconds(executors["close_timestamp"])
+        # All the fields are extracted in a single pass over the configs and custom infos.
+        field_names = ["trading_pair", "exchange", "level_id", "bep", "order_ids", "close_price", "sl", "tp", "tl"]
+        fields = {name: [] for name in field_names}
+        for config, custom_info in zip(executors["config"], executors["custom_info"]):
+            fields["trading_pair"].append(config["trading_pair"])
+            fields["exchange"].append(config["connector_name"])
+            fields["level_id"].append(config.get("level_id"))
+            fields["bep"].append(custom_info["current_position_average_price"])
+            fields["order_ids"].append(custom_info.get("order_ids"))
+            fields["close_price"].append(custom_info.get("close_price", custom_info["current_position_average_price"]))
+            fields["sl"].append(config.get("stop_loss"))
+            fields["tp"].append(config.get("take_profit"))
+            fields["tl"].append(config.get("time_limit"))
+        for name, values in fields.items():
+            column = pd.Series(values, index=executors.index, dtype=object if name == "order_ids" else None)
+            executors[name] = column.fillna(0) if name in ("sl", "tp", "tl") else column
         return executors
 
+    @staticmethod
+    def parse_json_column(column: pd.Series) -> List[Any]:
+        return [json_loads(value) if isinstance(value, (str, bytes)) else value for value in column]
+
     @property
     def executor_info_list(self) -> List[ExecutorInfo]:
+        return self.get_executor_info_list()
+
+    def get_executor_info_list(self, validate: bool = True) -> List[ExecutorInfo]:
+        """
+        Builds the ExecutorInfo of every executor from the columns, without boxing the rows into Series.
+        Args:
+        - validate (bool): If False the models are built with model_construct, for rows already validated (e.g. stored
+          by hummingbot). The values are kept as decoded (floats instead of Decimals) and the configs are built with
+          their executor config class without validating their nested fields.
+        """
         executors = self.apply_special_data_types(self.executors_df)
+        build_executor_info = ExecutorInfo if validate else self.construct_executor_info
+        columns = [executors[field].tolist() for field in EXECUTOR_INFO_FIELDS]
         executor_values = []
-        for index, row in executors.iterrows():
-            executor_to_append = ExecutorInfo(
-                id=row["id"],
-                timestamp=row["timestamp"],
-                type=row["type"],
-                close_timestamp=row["close_timestamp"],
-                close_type=row["close_type"],
-                status=row["status"],
-                config=row["config"],
-                net_pnl_pct=row["net_pnl_pct"],
-                net_pnl_quote=row["net_pnl_quote"],
-                cum_fees_quote=row["cum_fees_quote"],
-                filled_amount_quote=row["filled_amount_quote"],
-                is_active=row["is_active"],
-                is_trading=row["is_trading"],
-                custom_info=row["custom_info"],
-                controller_id=row["controller_id"]
-            )
-            executor_to_append.custom_info["side"] = row["side"]
+        for values, side in zip(zip(*columns), executors["side"].tolist()):
+            executor_to_append = build_executor_info(**dict(zip(EXECUTOR_INFO_FIELDS, values)))
+            executor_to_append.custom_info["side"] = side
             executor_values.append(executor_to_append)
         return executor_values
 
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def get_executor_config_classes() -> Dict[str, Any]:
+        config_classes = get_args(ExecutorInfo.model_fields["config"].annotation)
+        return {config_class.model_fields["type"].default: config_class for config_class in config_classes}
+
+    def construct_executor_info(self, **fields) -> ExecutorInfo:
+        config = fields["config"]
+        config_class = self.get_executor_config_classes().get(config.get("type")) if isinstance(config, dict) else None
+        if config_class is not None:
+            fields["config"] = config_class.model_construct(**config)
+        return ExecutorInfo.model_construct(**fields)
+
+    def summarize_results_from_columns(self, total_amount_quote: float = 1000) -> Dict[str, Any]:
+        """
+        Computes the summary of BacktestingEngineBase.summarize_results straight from the executors columns, without
+        building the ExecutorInfo models. The sums are done with floats instead of Decimals.
+        """
+        executors = self.apply_special_data_types(self.executors_df)
+        if executors.empty:
+            return dict(EMPTY_RESULTS)
+        net_pnl_quote = pd.to_numeric(executors["net_pnl_quote"]).astype(float)
+        filled_amount_quote = pd.to_numeric(executors["filled_amount_quote"]).astype(float)
+        with_position = net_pnl_quote != 0
+        positions_pnl_quote = net_pnl_quote[with_position]
+        positions_side = executors["side"][with_position]
+        total_long = (positions_side == TradeType.BUY).sum()
+        total_short = (positions_side == TradeType.SELL).sum()
+        correct_long = ((positions_side == TradeType.BUY) & (positions_pnl_quote > 0)).sum()
+        correct_short = ((positions_side == TradeType.SELL) & (positions_pnl_quote > 0)).sum()
+        close_types = executors.groupby(executors["close_type_name"].astype(object))["timestamp"].count().to_dict()
+        total_positions = len(positions_pnl_quote)
+        win_signals = int((positions_pnl_quote > 0).sum())
+        loss_signals = int((positions_pnl_quote < 0).sum())
+        max_draw_down, max_drawdown_pct, sharpe_ratio = 0.0, 0.0, 0.0
+        if total_positions:
+            cumulative_returns = positions_pnl_quote.cumsum()
+            max_draw_down = (cumulative_returns - np.maximum.accumulate(cumulative_returns)).min()
+            max_drawdown_pct = max_draw_down / (total_amount_quote + cumulative_returns.iloc[0])
+            returns = cumulative_returns / filled_amount_quote[with_position].cumsum()
+            sharpe_ratio = returns.mean() / returns.std() if len(returns) > 1 else 0
+        total_won = positions_pnl_quote[positions_pnl_quote > 0].sum()
+        total_loss = -positions_pnl_quote[positions_pnl_quote < 0].sum()
+        return {
+            "net_pnl": float(net_pnl_quote.sum() / total_amount_quote),
+            "net_pnl_quote": float(net_pnl_quote.sum()),
+            "total_executors": int(len(executors)),
+            "total_executors_with_position": int(total_positions),
+            "total_volume": float(filled_amount_quote[with_position].sum()),
+            "total_long": int(total_long),
+            "total_short": int(total_short),
+            "close_types": close_types,
+            "accuracy_long": float(correct_long / total_long) if total_long > 0 else 0.0,
+            "accuracy_short": float(correct_short / total_short) if total_short > 0 else 0.0,
+            "total_positions": int(total_positions),
+            "accuracy": win_signals / total_positions if total_positions else 0.0,
+            "max_drawdown_usd": float(max_draw_down),
+            "max_drawdown_pct": float(max_drawdown_pct),
+            "sharpe_ratio": float(sharpe_ratio),
+            "profit_factor": float(total_won / total_loss) if total_loss > 0 else 1.0,
+            "win_signals": win_signals,
+            "loss_signals": loss_signals,
+        }
+
     def apply_special_data_types(self, executors):
-        executors["status"] = executors["status"].apply(lambda x: self.get_enum_by_value(RunnableStatus, int(x)))
-        executors["side"] = executors["config"].apply(lambda x: self.get_enum_by_value(TradeType, int(x["side"])))
-        executors["close_type"] = executors["close_type"].apply(lambda x: self.get_enum_by_value(CloseType, int(x)))
-        executors["close_type_name"] = executors["close_type"].apply(lambda x: x.name)
+        executors["status"] = self.decode_enum(RunnableStatus, executors["status"])
+        executors["side"] = self.decode_enum(TradeType, [config["side"] for config in executors["config"]])
+        executors["close_type"] = self.decode_enum(CloseType, executors["close_type"])
+        executors["close_type_name"] = executors["close_type"].cat.rename_categories(
+            [close_type.name for close_type in executors["close_type"].cat.categories])
         executors["datetime"] = pd.to_datetime(executors.timestamp, unit="s")
         executors["close_datetime"] = pd.to_datetime(executors["close_timestamp"], unit="s")
         return executors
@@ -366,6 +465,28 @@ class PerformanceDataSource:
                 return member
         raise ValueError(f"No enum member with value {value}")
 
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def get_enum_lookup(enum_class) -> Tuple[pd.Index, List[Any]]:
+        """
+        Returns the index of the enum values and the members in the same order, to decode values by position.
+        """
+        members = list(enum_class)
+        return pd.Index([member.value for member in members]), members
+
+    def decode_enum(self, enum_class, values) -> pd.Categorical:
+        """
+        Decodes the enum values into a categorical of the enum members with a single lookup for all of them.
+        Raises:
+        - ValueError: If a value is not a member of the enum.
+        """
+        values_index, members = self.get_enum_lookup(enum_class)
+        values = pd.to_numeric(pd.Series(values)).astype(np.int64).to_numpy()
+        codes = values_index.get_indexer(values)
+        if (codes == -1).any():
+            raise ValueError(f"No enum member with value {values[codes == -1][0]}")
+        return pd.Categorical.from_codes(codes, categories=members)
+
     @staticmethod
     def ensure_timestamp_in_seconds(timestamp: float) -> float:
         """
@@ -388,4 +509,18 @@ class PerformanceDataSource:
             return timestamp_int
         else:
             raise ValueError(
-                "Timestamp is not in a recognized format. Must be in seconds, milliseconds, microseconds or nanoseconds.")
\ No newline at end of file
+                "Timestamp is not in a recognized format. Must be in seconds, milliseconds, microseconds or nanoseconds.")
+
+    @staticmethod
+    def ensure_timestamps_in_seconds(timestamps: pd.Series) -> pd.Series:
+        """
+        Vectorized ensure_timestamp_in_seconds for a column of timestamps.
+        Raises:
+        - ValueError: If any timestamp is not in a recognized format.
+        """
+        values = np.trunc(pd.to_numeric(timestamps, errors="coerce").to_numpy(dtype=np.float64))
+        if np.isnan(values).any() or (values < 1e9).any():
+            raise ValueError(
+                "Timestamp is not in a recognized format. Must be in seconds, milliseconds, microseconds or nanoseconds.")
+        divisors = np.select([values >= 1e18, values >= 1e15, values >= 1e12], [1e9, 1e6, 1e3], default=1)
+        return pd.Series(values / divisors, index=timestamps.index)
\ No newline at end of file